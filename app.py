@@ -0,0 +1,203 @@
+import os
+import json
+import streamlit as st
+import tracing
+from llm_client import get_llm_client
+from streaming import StreamTimings, stream_chat
+from conversation_context import ConversationContext, make_llm_summarizer
+from scenarios import CHAT_MODEL, SCENARIOS
+from feedback import COMPACT_FEEDBACK, feedback_request, new_precompute_state, precompute_turn, wait_for_precompute
+from session_store import get_session_store, owner_hash
+
+# --- Multi-scenario MI practice app ---
+# One process serves every scenario in scenarios.py. The embedding model is loaded
+# once and shared, and a scenario's rubric index is only built when it is needed.
+# rag_engine (faiss, the embedding backend and possibly torch) is not imported until
+# an API key has been entered: a background thread then warms the index up while
+# the student chats, since ordinary chat turns never touch retrieval.
+#
+#   streamlit run app.py              -> scenario picker (?scenario=hpv selects one)
+#   streamlit run OHI.py / HPV.py     -> a single fixed scenario
+
+INTRO = """
+Welcome to the **{app_name} App**. This chatbot simulates a realistic patient
+who is uncertain about {subject}. Your goal is to practice **Motivational Interviewing (MI)** skills
+by engaging in a natural conversation and helping the patient explore their thoughts and feelings.
+At the end, you’ll receive **detailed feedback** based on the official MI rubric.
+
+👉 To use this app, you'll need a **Groq API key**.
+[Follow these steps to generate your API key](https://docs.newo.ai/docs/groq-api-keys).
+"""
+
+# --- Working directory ---
+working_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_app(scenario_key, allow_switch=False):
+    # Every rerun is one trace: rubric loads, retrieval and LLM calls nest under it
+    tracing.start_metrics_server()
+    with tracing.span("streamlit.rerun", scenario=scenario_key):
+        _render(scenario_key, allow_switch)
+
+
+def _render(scenario_key, allow_switch):
+    scenario = SCENARIOS[scenario_key]
+
+    # --- Streamlit page configuration ---
+    st.set_page_config(
+        page_title=scenario.page_title,
+        page_icon=scenario.page_icon,
+        layout="centered"
+    )
+
+    if allow_switch:
+        keys = list(SCENARIOS)
+        choice = st.sidebar.selectbox(
+            "Scenario",
+            keys,
+            index=keys.index(scenario.key),
+            format_func=lambda key: SCENARIOS[key].app_name
+        )
+        if choice != scenario.key:
+            st.query_params["scenario"] = choice
+            st.rerun()
+
+    # --- UI: Title ---
+    st.title(f"{scenario.page_icon} {scenario.app_name}")
+    st.markdown(INTRO.format(app_name=scenario.app_name, subject=scenario.subject), unsafe_allow_html=True)
+
+    # --- Ask user to enter their GROQ API key ---
+    api_key = st.text_input("🔑 Enter your GROQ API Key", type="password")
+
+    # --- Warn and stop if key not provided ---
+    if not api_key:
+        st.warning("Please enter your GROQ API key above to continue.")
+        st.stop()
+
+    # --- Initialize client (pooled, rate-limited and shared across reruns for this key) ---
+    client = get_llm_client(api_key)
+
+    # For taking API key from json file
+    # config_data = json.load(open(f"{working_dir}/config.json"))
+    # client = get_llm_client(config_data.get("GROQ_API_KEY"))
+
+    # --- Warm up the rubric index in the background (once per process and scenario) ---
+    # Imported here rather than at the top: faiss and the embedding backend are only
+    # needed for feedback retrieval, not for the key prompt or ordinary chat turns
+    from rag_engine import get_engine, start_warm_up
+    rubrics_dir = os.path.join(working_dir, scenario.rubrics_dir)
+    start_warm_up(rubrics_dir)
+
+    # --- Per-scenario session state (switching scenarios keeps each conversation) ---
+    # Sessions are also written to the session store; ?session=<id> in the URL resumes
+    # one after a reload or restart, but only for the API key that started it
+    store = get_session_store()
+    owner = owner_hash(api_key)
+    session_key = f"mi_session_{scenario.key}"
+    if session_key not in st.session_state:
+        stored = None
+        requested_id = st.query_params.get("session")
+        if store is not None and requested_id:
+            stored = store.load_session(requested_id, owner=owner)
+            if stored is not None and stored["scenario"] != scenario.key:
+                stored = None
+        if stored is not None and stored["chat_history"]:
+            st.session_state[session_key] = {
+                "session_id": stored["id"],
+                "chat_history": stored["chat_history"],
+                "context_state": ConversationContext.new_state(),
+                "latency_log": stored["latency_log"],
+                "precompute": new_precompute_state(),
+            }
+        else:
+            greeting = {"role": "assistant", "content": scenario.greeting}
+            session_id = None
+            if store is not None:
+                session_id = store.start_session(scenario.key, metadata={"owner": owner})
+                store.append_message(session_id, "assistant", greeting["content"])
+            st.session_state[session_key] = {
+                "session_id": session_id,
+                "chat_history": [greeting],
+                "context_state": ConversationContext.new_state(),  # rolling summary of older turns
+                "latency_log": [],  # time to first token / total time per LLM request
+                "precompute": new_precompute_state(),  # per-turn codes and retrieval (MI_COMPACT_FEEDBACK)
+            }
+    session = st.session_state[session_key]
+    chat_history = session["chat_history"]
+    session_id = session["session_id"]
+    if session_id and st.query_params.get("session") != session_id:
+        st.query_params["session"] = session_id
+
+    # Keeps each turn's prompt under the token budget; chat_history stays complete for feedback
+    conversation_context = ConversationContext(make_llm_summarizer(client))
+
+    # --- Display chat history ---
+    for message in chat_history:
+        label = scenario.student_display if message["role"] == "user" else scenario.patient_display
+        with st.chat_message(message["role"]):
+            st.markdown(f"**{label}**: {message['content']}" if label else message["content"])
+
+    # --- Finish Session Button (Feedback with RAG) ---
+    if st.button("Finish Session & Get Feedback"):
+        with tracing.span("feedback", turns=len(chat_history)):
+            with st.spinner("Loading MI rubric examples..."):
+                # Usually ready from the warm-up thread; otherwise this waits for it to finish
+                with tracing.span("rag.get_engine"):
+                    rag_engine = get_engine(rubrics_dir)
+                if COMPACT_FEEDBACK:
+                    # Compact prompt assembled from what precompute_turn() cached per turn
+                    wait_for_precompute(session["precompute"])
+                    request = feedback_request(scenario, chat_history, rag_engine, precomputed=session["precompute"])
+                else:
+                    # Same transcript, per-category rubric context and review prompt as batch_grade.py
+                    request = feedback_request(scenario, chat_history, rag_engine)
+
+            st.markdown("### Session Feedback")
+            timings = StreamTimings(kind="feedback")
+            feedback_text = st.write_stream(stream_chat(client, timings, **request))
+            session["latency_log"].append(timings.as_dict())
+            if session_id:
+                store.append_feedback(session_id, feedback_text, timings.as_dict())
+
+    # --- User Input ---
+    user_prompt = st.chat_input("Your response...")
+
+    if user_prompt:
+        with tracing.span("chat.turn", turn=len(chat_history)) as turn_span:
+            chat_history.append({"role": "user", "content": user_prompt})
+            if session_id:
+                store.append_message(session_id, "user", user_prompt)
+            if COMPACT_FEEDBACK:
+                # Code, embed and retrieve for this turn in the background while the patient replies
+                precompute_turn(session["precompute"], chat_history, lambda: get_engine(rubrics_dir))
+            st.chat_message("user").markdown(user_prompt)
+
+            with tracing.span("context.build"):
+                messages = conversation_context.build(
+                    scenario.chat_prefix(),
+                    chat_history,
+                    session["context_state"]
+                )
+            turn_span.set(prompt_tokens_estimate=conversation_context.prompt_tokens(messages))
+
+            # Stream the reply into the chat bubble as tokens arrive
+            timings = StreamTimings(kind="turn")
+            with st.chat_message("assistant"):
+                assistant_response = st.write_stream(stream_chat(
+                    client,
+                    timings,
+                    model=CHAT_MODEL,
+                    messages=messages
+                ))
+
+            chat_history.append({"role": "assistant", "content": assistant_response})
+            # Summarize old turns in the background while the student writes the next one
+            conversation_context.update(scenario.chat_prefix(), chat_history, session["context_state"])
+            session["latency_log"].append(timings.as_dict())
+            if session_id:
+                store.append_message(session_id, "assistant", assistant_response, timings.as_dict())
+
+
+if __name__ == "__main__":
+    requested = st.query_params.get("scenario", "ohi")
+    run_app(requested if requested in SCENARIOS else "ohi", allow_switch=True)
@@ -0,0 +1,181 @@
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import tracing
+from feedback import feedback_request
+from llm_client import get_llm_client
+from rag_engine import get_engine
+from scenarios import SCENARIOS
+
+# --- Offline batch grading ---
+# Grades saved student transcripts without the Streamlit UI, using the same RAG
+# context and review prompt as the "Finish Session & Get Feedback" button.
+#
+#   python batch_grade.py transcripts/ --scenario ohi --output feedback.jsonl
+#   python batch_grade.py sessions.jsonl --concurrency 8 --output feedback.jsonl
+#
+# Input is a folder of .json / .txt transcripts or a JSONL file with one session per
+# line ({"id", "scenario", "chat_history"} or {"id", "transcript"}). Every result is
+# appended to the output JSONL as soon as it is ready; rerunning with the same output
+# skips sessions that already have feedback, so a crash never redoes finished work.
+
+working_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Speaker prefixes that mark the student's side of a plain-text transcript
+STUDENT_LINE = re.compile(r"^\s*(student|provider|providert|user)\s*(\([^)]*\))?\s*:\s*", re.IGNORECASE)
+PATIENT_LINE = re.compile(r"^\s*(patient|assistant|alex)\s*(\([^)]*\))?\s*:\s*", re.IGNORECASE)
+
+
+def parse_transcript(text):
+    """Turn "STUDENT: ..." / "PATIENT (Alex): ..." lines into a chat_history list."""
+    chat_history = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        for pattern, role in ((STUDENT_LINE, "user"), (PATIENT_LINE, "assistant")):
+            match = pattern.match(line)
+            if match:
+                chat_history.append({"role": role, "content": line[match.end():].strip()})
+                break
+        else:
+            # Continuation of the previous turn
+            if chat_history:
+                chat_history[-1]["content"] += "\n" + line.strip()
+    return chat_history
+
+
+def normalize_record(record, default_id, default_scenario):
+    chat_history = record.get("chat_history")
+    if chat_history is None:
+        chat_history = parse_transcript(record.get("transcript", ""))
+    return {
+        "id": str(record.get("id", default_id)),
+        "scenario": record.get("scenario", default_scenario),
+        "chat_history": chat_history,
+    }
+
+
+def load_sessions(source, default_scenario):
+    if os.path.isdir(source):
+        for filename in sorted(os.listdir(source)):
+            path = os.path.join(source, filename)
+            session_id = os.path.splitext(filename)[0]
+            if filename.endswith(".json"):
+                with open(path, "r", encoding="utf-8") as f:
+                    yield normalize_record(json.load(f), session_id, default_scenario)
+            elif filename.endswith(".txt"):
+                with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                    yield normalize_record({"transcript": f.read()}, session_id, default_scenario)
+        return
+
+    with open(source, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if line.strip():
+                yield normalize_record(json.loads(line), f"line-{line_number}", default_scenario)
+
+
+def load_checkpoint(output_path):
+    """Ids that already have feedback in the output file."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by a crash
+            if "feedback" in result:
+                done.add(result["id"])
+    return done
+
+
+def grade_session(client, session):
+    scenario = SCENARIOS.get(session["scenario"])
+    if scenario is None:
+        raise ValueError(f"unknown scenario {session['scenario']!r}, expected one of {sorted(SCENARIOS)}")
+    rag_engine = get_engine(os.path.join(working_dir, scenario.rubrics_dir))
+    start = time.perf_counter()
+    with tracing.span("batch.grade", session=session["id"], scenario=scenario.key):
+        response = client.chat.completions.create(**feedback_request(scenario, session["chat_history"], rag_engine))
+    return {
+        "id": session["id"],
+        "scenario": scenario.key,
+        "feedback": response.choices[0].message.content,
+        "seconds": round(time.perf_counter() - start, 3),
+        "graded_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+async def grade_all(client, sessions, output_path, concurrency):
+    queue = asyncio.Queue()
+    for session in sessions:
+        queue.put_nowait(session)
+    counts = {"graded": 0, "failed": 0}
+    # Our own pool: the default executor has min(32, cpus + 4) threads and would cap
+    # --concurrency on small containers
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch-grade")
+
+    with executor, open(output_path, "a", encoding="utf-8") as output:
+        def checkpoint(result):
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            output.flush()
+            os.fsync(output.fileno())
+
+        async def worker():
+            while True:
+                try:
+                    session = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    result = await loop.run_in_executor(executor, grade_session, client, session)
+                    counts["graded"] += 1
+                except Exception as error:
+                    # Recorded without "feedback", so the next run retries it
+                    result = {"id": session["id"], "scenario": session["scenario"], "error": repr(error)}
+                    counts["failed"] += 1
+                checkpoint(result)
+                print(f"[{counts['graded'] + counts['failed']}] {session['id']}: {'error' if 'error' in result else 'ok'}")
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Grade saved MI transcripts with the RAG feedback prompt.")
+    parser.add_argument("source", help="folder of .json/.txt transcripts or a JSONL file of sessions")
+    parser.add_argument("--output", default="feedback.jsonl")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="ohi",
+                        help="scenario for sessions that do not name one")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--api-key", default=os.environ.get("GROQ_API_KEY"))
+    args = parser.parse_args()
+
+    if not args.api_key:
+        parser.error("pass --api-key or set GROQ_API_KEY")
+
+    done = load_checkpoint(args.output)
+    sessions = [session for session in load_sessions(args.source, args.scenario) if session["id"] not in done]
+    print(f"{len(done)} already graded, {len(sessions)} to go")
+
+    # Build each scenario's index up front instead of inside the first workers; sessions
+    # naming an unknown scenario fail on their own in grade_session
+    for key in {session["scenario"] for session in sessions} & SCENARIOS.keys():
+        get_engine(os.path.join(working_dir, SCENARIOS[key].rubrics_dir))
+
+    # No wait cap: queued workers sit out the per-minute limits instead of failing
+    client = get_llm_client(args.api_key, interactive=False)
+    counts = asyncio.run(grade_all(client, sessions, args.output, max(1, args.concurrency)))
+    print(json.dumps({**counts, "skipped": len(done), "client": client.stats()}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+# --- Benchmarks and load tests ---
+# Run from the repository root so the app modules are importable:
+#
+#   python -m benchmarks.stub_server --port 8765      # OpenAI/Groq-compatible fake LLM
+#   python -m benchmarks.bench_rag ohi_rubrics hpv_rubrics --output rag.json
+#   python -m benchmarks.load_driver --sessions 50 --output load.json
+#
+# Nothing here needs network access; every result is written as JSON (see results.py).
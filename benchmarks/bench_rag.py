@@ -0,0 +1,148 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.results import REPO_DIR, emit, latency_summary
+from chunking import DEFAULT_CHUNKING, iter_chunks, tokenizer_length_fn
+from embedding_backends import EmbeddingUnavailable
+from embedding_cache import EmbeddingCache
+from rag_engine import MI_CATEGORY_QUERIES, RubricRAGEngine, get_embedding_model, list_rubric_files
+from vector_index import DEFAULT_INDEX, build_index, normalize
+
+# --- Retrieval benchmark ---
+# Times each stage of building a rubric index (reading the corpus, chunking,
+# embedding, FAISS and BM25 builds, cold and cached engine start) and the latency
+# percentiles of every retrieval entry point.
+#
+#   python -m benchmarks.bench_rag ohi_rubrics hpv_rubrics --queries 200 --output rag.json
+
+STUDENT_QUERIES = [
+    "What brings you in today?",
+    "How often do you usually brush your teeth?",
+    "It sounds like mornings are really busy for you.",
+    "On a scale from 1 to 10, how important is flossing to you?",
+    "Would it be okay if I shared some information about the HPV vaccine?",
+    "You already know a lot about what works for your family.",
+    "What would make it easier to brush at night?",
+    "So, to sum up, you'd like to try brushing before bed three nights this week.",
+    "open-ended question",
+    "change talk",
+    "Partially Met affirmation",
+]
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def bench_build(rubrics_dir, model):
+    paths = list_rubric_files(rubrics_dir)
+
+    def read_all():
+        texts = {}
+        for path in paths:
+            with open(path, "rb") as f:
+                texts[path] = f.read().decode("utf-8", errors="ignore")
+        return texts
+
+    texts, load_seconds = timed(read_all)
+    length_fn = tokenizer_length_fn(getattr(model, "tokenizer", None)) if DEFAULT_CHUNKING.unit == "tokens" else None
+    chunks, chunk_seconds = timed(lambda: [
+        chunk for path, text in texts.items()
+        for chunk in iter_chunks(text, os.path.basename(path), DEFAULT_CHUNKING, length_fn)
+    ])
+
+    stages = {
+        "files": len(paths),
+        "bytes": sum(len(text) for text in texts.values()),
+        "chunks": len(chunks),
+        "corpus_load_seconds": load_seconds,
+        "chunking_seconds": chunk_seconds,
+    }
+    try:
+        vectors, stages["embedding_seconds"] = timed(model.encode, [chunk.text for chunk in chunks])
+    except EmbeddingUnavailable:
+        # Precomputed-only backend: the engine numbers below come from the cache
+        stages["embedding_seconds"] = None
+        return stages
+    ids = np.arange(len(chunks), dtype="int64")
+    _, stages["index_build_seconds"] = timed(
+        build_index, DEFAULT_INDEX, vectors.shape[1], normalize(vectors) if DEFAULT_INDEX.normalized else vectors, ids
+    )
+    stages["index_kind"] = DEFAULT_INDEX.kind
+    return stages
+
+
+def bench_engine(rubrics_dir, model, cache_dir):
+    cache = EmbeddingCache(cache_dir) if cache_dir else None
+    engine, cold_seconds = timed(RubricRAGEngine, rubrics_dir, model, cache=cache)
+    stats = engine.stats()
+    _, warm_seconds = timed(RubricRAGEngine, rubrics_dir, model, cache=cache) if cache else (None, None)
+    return engine, {
+        "engine_cold_seconds": cold_seconds,
+        "engine_cached_seconds": warm_seconds,
+        "files_embedded": stats["files_embedded"],
+        "lexical": stats["lexical"],
+    }
+
+
+def bench_queries(engine, num_queries, seed=0):
+    rng = random.Random(seed)
+    queries = [rng.choice(STUDENT_QUERIES + list(MI_CATEGORY_QUERIES.values())) for _ in range(num_queries)]
+    results = {}
+    for name, search in (
+        ("retrieve", lambda query: engine.retrieve(query, top_k=2)),
+        ("vector_search", lambda query: engine.vector_search(query, top_k=2)),
+        ("lexical_search", lambda query: engine.lexical_search(query, top_k=2)),
+    ):
+        latencies = []
+        try:
+            for query in queries:
+                latencies.append(timed(search, query)[1])
+        except EmbeddingUnavailable:
+            pass
+        results[name] = latency_summary(latencies)
+
+    transcripts = [rng.sample(STUDENT_QUERIES, k=min(6, len(STUDENT_QUERIES))) for _ in range(max(1, num_queries // 10))]
+    results["retrieve_for_feedback"] = latency_summary(
+        [timed(engine.retrieve_for_feedback, turns)[1] for turns in transcripts]
+    )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark rubric index builds and retrieval latency.")
+    parser.add_argument("rubric_dirs", nargs="*", default=["ohi_rubrics", "hpv_rubrics"])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--cache-dir", default=None,
+                        help="embedding cache to benchmark against (default: a fresh temporary one)")
+    parser.add_argument("--output", default=None, help="also write the JSON here")
+    args = parser.parse_args()
+
+    model, model_seconds = timed(get_embedding_model)
+    corpora = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        cache_dir = args.cache_dir or scratch
+        for rubrics_dir in args.rubric_dirs:
+            path = rubrics_dir if os.path.isabs(rubrics_dir) else os.path.join(REPO_DIR, rubrics_dir)
+            build = bench_build(path, model)
+            engine, engine_numbers = bench_engine(path, model, cache_dir)
+            corpora[rubrics_dir] = {"build": {**build, **engine_numbers}, "latency": bench_queries(engine, args.queries)}
+
+    emit("rag", {
+        "embedding_model": model.name,
+        "model_load_seconds": model_seconds,
+        "chunking": DEFAULT_CHUNKING.as_dict(),
+        "index": DEFAULT_INDEX.as_dict(),
+        "corpora": corpora,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import argparse
+import os
+import random
+import threading
+import time
+
+from benchmarks.results import REPO_DIR, emit, latency_summary
+from benchmarks.stub_server import add_config_arguments, config_from_args, start_stub_server
+from conversation_context import ConversationContext, make_llm_summarizer
+from feedback import feedback_request
+from llm_client import DEFAULT_REQUESTS_PER_MINUTE, DEFAULT_TOKENS_PER_MINUTE, get_llm_client
+from rag_engine import get_engine
+from scenarios import CHAT_MODEL, SCENARIOS
+from streaming import StreamTimings, stream_chat
+
+# --- Multi-session load driver ---
+# Simulates a class of students chatting at the same time: every session runs the
+# same context building and streamed request as app.py, from its own API key. Once
+# every session has finished chatting they all press "Finish Session & Get Feedback"
+# together, the end-of-class burst, and the feedback path is timed separately.
+#
+#   python -m benchmarks.load_driver --sessions 50 --turns 6 --output load.json
+#   python -m benchmarks.load_driver --sessions 50 --error-rate 0.1 --requests-per-minute 30
+#   python -m benchmarks.load_driver --base-url http://127.0.0.1:8765   # an already running stub
+#
+# Without --base-url a stub server (benchmarks/stub_server.py) is started in-process.
+# Each client still applies its own per-key limits (Groq free tier by default), so set
+# MI_LLM_REQUESTS_PER_MINUTE / MI_LLM_TOKENS_PER_MINUTE to model a paid plan.
+
+STUDENT_TURNS = [
+    "Hi, I'm the dental student working with you today. What brings you in?",
+    "How do you usually take care of your teeth during the week?",
+    "It sounds like mornings are really rushed for you.",
+    "On a scale from 1 to 10, how important is it for you to brush twice a day?",
+    "What would make it a bit easier to brush at night?",
+    "You've already thought a lot about what fits into your routine.",
+    "Would it be okay if I shared a few tips that have worked for other patients?",
+    "So you'd like to try brushing before bed three nights this week. Did I get that right?",
+]
+
+
+class Session(threading.Thread):
+    def __init__(self, number, args, base_url, burst):
+        super().__init__(name=f"session-{number}", daemon=True)
+        self.number = number
+        self.args = args
+        self.scenario = SCENARIOS[args.scenario]
+        self.burst = burst
+        self.random = random.Random(args.seed + number)
+        api_key = "bench-shared" if args.shared_key else f"bench-{number}"
+        self.client = get_llm_client(api_key, base_url=base_url)
+        self.turns = []  # {"e2e", "ttft", "total", "prompt_tokens"}
+        self.feedback = None
+        self.errors = []
+
+    def _think(self):
+        if self.args.think_time:
+            time.sleep(self.random.uniform(0.5, 1.5) * self.args.think_time)
+
+    def run(self):
+        chat_history = [{"role": "assistant", "content": self.scenario.greeting}]
+        context_state = ConversationContext.new_state()
+        conversation_context = ConversationContext(make_llm_summarizer(self.client))
+        # Students start a little apart, not on the same millisecond
+        time.sleep(self.random.uniform(0, self.args.ramp_up))
+
+        for turn in range(self.args.turns):
+            self._think()
+            text = f"{STUDENT_TURNS[turn % len(STUDENT_TURNS)]} (session {self.number})"
+            chat_history.append({"role": "user", "content": text})
+            start = time.perf_counter()
+            timings = StreamTimings(kind="turn")
+            try:
+                messages = conversation_context.build(
+                    self.scenario.chat_prefix(),
+                    chat_history,
+                    context_state,
+                )
+                reply = "".join(stream_chat(self.client, timings, model=CHAT_MODEL, messages=messages))
+            except Exception as error:
+                self.errors.append(repr(error))
+                chat_history.pop()
+                continue
+            chat_history.append({"role": "assistant", "content": reply})
+            conversation_context.update(self.scenario.chat_prefix(), chat_history, context_state)
+            self.turns.append({
+                "e2e": time.perf_counter() - start,
+                "ttft": timings.ttft_seconds,
+                "total": timings.total_seconds,
+                "prompt_tokens": conversation_context.prompt_tokens(messages),
+            })
+
+        # End of class: everybody asks for feedback at once
+        self.burst.wait()
+        start = time.perf_counter()
+        timings = StreamTimings(kind="feedback")
+        try:
+            rag_engine = get_engine(os.path.join(REPO_DIR, self.scenario.rubrics_dir))
+            request = feedback_request(self.scenario, chat_history, rag_engine)
+            rag_seconds = time.perf_counter() - start
+            "".join(stream_chat(self.client, timings, **request))
+        except Exception as error:
+            self.errors.append(repr(error))
+            return
+        self.feedback = {
+            "e2e": time.perf_counter() - start,
+            "rag": rag_seconds,
+            "ttft": timings.ttft_seconds,
+            "total": timings.total_seconds,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test concurrent MI chat sessions against a stub LLM.")
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=6)
+    parser.add_argument("--think-time", type=float, default=2.0, help="mean seconds a student takes per reply")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="sessions start spread over this many seconds")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="ohi")
+    parser.add_argument("--shared-key", action="store_true", help="all sessions share one API key (one rate limit)")
+    parser.add_argument("--base-url", default=None, help="use a running OpenAI/Groq-compatible server")
+    parser.add_argument("--output", default=None, help="also write the JSON here")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    if args.seed is None:
+        args.seed = 0
+
+    # The real Groq backend pointed at the stub, never the in-process fake
+    os.environ["MI_LLM_BACKEND"] = "groq"
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server, base_url = start_stub_server(config_from_args(args))
+
+    # Build the rubric index before the clock starts, as the app's warm-up thread does
+    start = time.perf_counter()
+    get_engine(os.path.join(REPO_DIR, SCENARIOS[args.scenario].rubrics_dir))
+    index_seconds = time.perf_counter() - start
+
+    burst = threading.Barrier(args.sessions)
+    sessions = [Session(number, args, base_url, burst) for number in range(args.sessions)]
+    start = time.perf_counter()
+    for session in sessions:
+        session.start()
+    for session in sessions:
+        session.join()
+    wall_seconds = time.perf_counter() - start
+
+    turns = [turn for session in sessions for turn in session.turns]
+    feedback = [session.feedback for session in sessions if session.feedback]
+    clients = {}
+    for session in sessions:
+        clients[id(session.client)] = session.client.stats()
+    client_totals = {
+        name: sum(stats[name] for stats in clients.values())
+        for name in ("requests", "retries", "errors", "rate_limit_wait_seconds")
+    }
+
+    emit("load", {
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "client_limits": {"requests_per_minute": DEFAULT_REQUESTS_PER_MINUTE,
+                          "tokens_per_minute": DEFAULT_TOKENS_PER_MINUTE},
+        "index_build_seconds": index_seconds,
+        "wall_seconds": wall_seconds,
+        "turns": {
+            "completed": len(turns),
+            "e2e": latency_summary([turn["e2e"] for turn in turns]),
+            "ttft": latency_summary([turn["ttft"] for turn in turns]),
+            "total": latency_summary([turn["total"] for turn in turns]),
+            "prompt_tokens_max": max((turn["prompt_tokens"] for turn in turns), default=0),
+        },
+        "feedback_burst": {
+            "completed": len(feedback),
+            "e2e": latency_summary([item["e2e"] for item in feedback]),
+            "rag": latency_summary([item["rag"] for item in feedback]),
+            "ttft": latency_summary([item["ttft"] for item in feedback]),
+            "total": latency_summary([item["total"] for item in feedback]),
+        },
+        "errors": [error for session in sessions for error in session.errors][:20],
+        "error_count": sum(len(session.errors) for session in sessions),
+        "client": client_totals,
+        "server": server.state.stats() if server is not None else None,
+    }, args.output)
+    if server is not None:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
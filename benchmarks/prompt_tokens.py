@@ -0,0 +1,113 @@
+import argparse
+
+from benchmarks.load_driver import STUDENT_TURNS
+from benchmarks.results import emit
+from conversation_context import DEFAULT_BUDGET_TOKENS, ConversationContext, count_tokens, message_tokens
+from scenarios import SCENARIOS, TURN_INSTRUCTION
+
+# --- Per-turn prompt size report ---
+# Replays a scripted session through ConversationContext twice: once with the old
+# prompt assembly (both roles in one system prompt plus a separate turn instruction)
+# and once with the role-specific patient prefix. For each turn it reports the prompt
+# tokens and how many of them repeat the previous request byte for byte, i.e. the
+# part a provider-side prompt cache can serve. No LLM is called.
+#
+#   python -m benchmarks.prompt_tokens --turns 12 --output prompt_tokens.json
+
+PATIENT_REPLY = (
+    "Honestly? I try to brush twice a day, but some nights I just crash before bed. "
+    "I know I should floss too, it just feels like one more thing on a long list."
+)
+
+
+def legacy_prefix(scenario):
+    # One prompt for both roles, as every chat turn and the feedback request used to send
+    combined = f"\n{scenario.patient_prompt}\n---\n\n{scenario.evaluator_prompt}"
+    return [{"role": "system", "content": combined}, {"role": "system", "content": TURN_INSTRUCTION}]
+
+
+def fake_summarizer(summary, turns):
+    # Stands in for the LLM summary: about the 150 words SUMMARY_PROMPT asks for
+    return " ".join(["patient", "habits"] * 75)
+
+
+def shared_prefix_tokens(messages, previous):
+    shared = 0
+    for message, earlier in zip(messages, previous or []):
+        if message != earlier:
+            break
+        shared += message_tokens(message)
+    return shared
+
+
+def replay(scenario, prefix, turns, budget_tokens):
+    context = ConversationContext(fake_summarizer, budget_tokens=budget_tokens)
+    state = ConversationContext.new_state()
+    chat_history = [{"role": "assistant", "content": scenario.greeting}]
+    rows, previous = [], None
+    for turn in range(turns):
+        chat_history.append({"role": "user", "content": STUDENT_TURNS[turn % len(STUDENT_TURNS)]})
+        messages = context.build(prefix, chat_history, state)
+        rows.append({
+            "turn": turn + 1,
+            "prompt_tokens": context.prompt_tokens(messages),
+            "cacheable_tokens": shared_prefix_tokens(messages, previous),
+        })
+        previous = messages
+        chat_history.append({"role": "assistant", "content": PATIENT_REPLY})
+        context.update(prefix, chat_history, state, wait=True)
+    return rows
+
+
+def report(scenario, turns, budget_tokens):
+    before = replay(scenario, legacy_prefix(scenario), turns, budget_tokens)
+    after = replay(scenario, scenario.chat_prefix(), turns, budget_tokens)
+    total_before = sum(row["prompt_tokens"] for row in before)
+    total_after = sum(row["prompt_tokens"] for row in after)
+    return {
+        "prefix_tokens": {
+            "before": sum(message_tokens(message) for message in legacy_prefix(scenario)),
+            "after": sum(message_tokens(message) for message in scenario.chat_prefix()),
+        },
+        "feedback_system_tokens": {
+            "before": count_tokens(legacy_prefix(scenario)[0]["content"]),
+            "after": count_tokens(scenario.evaluator_prompt),
+        },
+        "session_prompt_tokens": {
+            "before": total_before,
+            "after": total_after,
+            "saved_percent": round(100 * (total_before - total_after) / total_before, 1),
+        },
+        # Share of the session's prompt tokens that repeat the previous request's prefix
+        "cacheable_percent": {
+            "before": round(100 * sum(row["cacheable_tokens"] for row in before) / total_before, 1),
+            "after": round(100 * sum(row["cacheable_tokens"] for row in after) / total_after, 1),
+        },
+        "turns": [
+            {"turn": old["turn"], "before": old["prompt_tokens"], "after": new["prompt_tokens"],
+             "cacheable_before": old["cacheable_tokens"], "cacheable_after": new["cacheable_tokens"]}
+            for old, new in zip(before, after)
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report per-turn prompt tokens before and after the prompt split.")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append", default=None)
+    parser.add_argument("--turns", type=int, default=12)
+    parser.add_argument("--budget-tokens", type=int, default=DEFAULT_BUDGET_TOKENS)
+    parser.add_argument("--output", default=None, help="also write the JSON here")
+    args = parser.parse_args()
+
+    emit("prompt_tokens", {
+        "turns": args.turns,
+        "budget_tokens": args.budget_tokens,
+        "scenarios": {
+            key: report(SCENARIOS[key], args.turns, args.budget_tokens)
+            for key in (args.scenario or sorted(SCENARIOS))
+        },
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- Local OpenAI/Groq-compatible LLM stub ---
+# Serves POST .../chat/completions (plain JSON or SSE streaming) with a configurable
+# time to first token, token rate and 429 injection, so the real GroqBackend can be
+# load-tested without network access:
+#
+#   python -m benchmarks.stub_server --port 8765 --latency 0.3 --tokens-per-second 60
+#   get_llm_client(key, base_url="http://127.0.0.1:8765")
+#
+# 429s come from --error-rate (random) and from --requests-per-minute, a sliding
+# window per API key like Groq's. GET /stats returns the request counters.
+
+WORDS = (
+    "I guess I know I should brush more often but mornings are rushed and at night "
+    "I am just tired so it slips and honestly I am not sure it makes that much difference"
+).split()
+
+
+@dataclass
+class StubConfig:
+    latency: float = 0.2  # seconds before the first token
+    tokens_per_second: float = 80.0  # 0 sends the whole reply at once
+    reply_tokens: int = 40
+    long_reply_tokens: int = 400  # replies to long prompts, i.e. feedback reports
+    long_prompt_chars: int = 3000
+    error_rate: float = 0.0
+    requests_per_minute: int = 0  # per API key, 0 = unlimited
+    retry_after: float = 1.0
+    seed: int = None
+
+
+class StubState:
+    def __init__(self, config):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.windows = defaultdict(deque)  # api key -> recent request times
+        self.counts = {"requests": 0, "streamed": 0, "rate_limited": 0, "completed": 0, "completion_tokens": 0}
+        self.lock = threading.Lock()
+
+    def admit(self, api_key):
+        """Return None to serve the request or the seconds a 429 should ask to wait."""
+        now = time.monotonic()
+        with self.lock:
+            self.counts["requests"] += 1
+            if self.random.random() < self.config.error_rate:
+                self.counts["rate_limited"] += 1
+                return self.config.retry_after
+            if self.config.requests_per_minute:
+                window = self.windows[api_key]
+                while window and now - window[0] >= 60:
+                    window.popleft()
+                if len(window) >= self.config.requests_per_minute:
+                    self.counts["rate_limited"] += 1
+                    return max(self.config.retry_after, 60 - (now - window[0]))
+                window.append(now)
+            return None
+
+    def remaining(self, api_key):
+        if not self.config.requests_per_minute:
+            return 1000
+        with self.lock:
+            return max(0, self.config.requests_per_minute - len(self.windows[api_key]))
+
+    def record(self, streamed, completion_tokens):
+        with self.lock:
+            self.counts["completed"] += 1
+            self.counts["streamed"] += streamed
+            self.counts["completion_tokens"] += completion_tokens
+
+    def stats(self):
+        with self.lock:
+            return {"config": asdict(self.config), **self.counts}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like api.groq.com
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/stats"):
+            self._send_json(200, self.state.stats())
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        api_key = self.headers.get("Authorization", "")
+        retry_after = self.state.admit(api_key)
+        if retry_after is not None:
+            self._send_json(
+                429,
+                {"error": {"message": "Rate limit reached (stub)", "type": "requests", "code": "rate_limit_exceeded"}},
+                {"retry-after": f"{retry_after:.2f}", "x-ratelimit-remaining-requests": "0",
+                 "x-ratelimit-reset-requests": f"{retry_after:.2f}s"},
+            )
+            return
+
+        config = self.state.config
+        messages = body.get("messages", [])
+        prompt_chars = sum(len(message.get("content") or "") for message in messages)
+        reply_tokens = config.long_reply_tokens if prompt_chars > config.long_prompt_chars else config.reply_tokens
+        if body.get("max_tokens"):
+            reply_tokens = min(reply_tokens, int(body["max_tokens"]))
+        words = [WORDS[i % len(WORDS)] for i in range(max(1, reply_tokens))]
+        usage = {"prompt_tokens": prompt_chars // 4, "completion_tokens": len(words),
+                 "total_tokens": prompt_chars // 4 + len(words)}
+        headers = {"x-ratelimit-remaining-requests": str(self.state.remaining(api_key)),
+                   "x-ratelimit-remaining-tokens": "100000"}
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = body.get("model", "stub")
+
+        time.sleep(config.latency)
+        if not body.get("stream"):
+            if config.tokens_per_second:
+                time.sleep(len(words) / config.tokens_per_second)
+            self._send_json(200, {
+                "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)},
+                             "finish_reason": "stop"}],
+                "usage": usage,
+            }, headers)
+            self.state.record(False, len(words))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        def event(delta, finish_reason=None, extra=None):
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+            chunk.update(extra or {})
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+
+        try:
+            for position, word in enumerate(words):
+                if config.tokens_per_second:
+                    time.sleep(1.0 / config.tokens_per_second)
+                event({"role": "assistant", "content": word if position == 0 else " " + word})
+            event({}, "stop", {"x_groq": {"usage": usage}})
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            return  # the client went away mid-stream
+        self.state.record(True, len(words))
+
+
+def start_stub_server(config=None, host="127.0.0.1", port=0):
+    """Serve the stub from a daemon thread; returns ``(server, base_url)``."""
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.state = StubState(config or StubConfig())
+    threading.Thread(target=server.serve_forever, name="llm-stub", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def add_config_arguments(parser):
+    defaults = StubConfig()
+    parser.add_argument("--latency", type=float, default=defaults.latency, help="seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second)
+    parser.add_argument("--reply-tokens", type=int, default=defaults.reply_tokens)
+    parser.add_argument("--long-reply-tokens", type=int, default=defaults.long_reply_tokens)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate, help="fraction of requests answered with 429")
+    parser.add_argument("--requests-per-minute", type=int, default=defaults.requests_per_minute,
+                        help="per API key; 0 = unlimited")
+    parser.add_argument("--retry-after", type=float, default=defaults.retry_after)
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def config_from_args(args):
+    return StubConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        reply_tokens=args.reply_tokens,
+        long_reply_tokens=args.long_reply_tokens,
+        error_rate=args.error_rate,
+        requests_per_minute=args.requests_per_minute,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI/Groq-compatible stub LLM server for load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(config_from_args(args), args.host, args.port)
+    print(f"stub LLM serving at {base_url} (base_url for get_llm_client); Ctrl+C to stop")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import os
+import re
+from dataclasses import asdict, dataclass
+
+# --- Rubric / transcript chunking ---
+# One pass over the words with a running length counter, so chunking stays linear in
+# the size of the corpus. Lengths are measured in characters (the apps' original
+# 200-character chunks) or in embedding-model tokens, and chunks can optionally be
+# cut at speaker turns and rubric category headers.
+#
+#   MI_RAG_CHUNKING=tokens    128-token structured chunks (default)
+#   MI_RAG_CHUNKING=chars     the original 200-character chunks, no structure or overlap
+
+WORD_PATTERN = re.compile(r"\S+")
+
+# "Provider:", "Patient:", "STUDENT:", "PATIENT (Alex):", and the "Providert:" typo in the OHI transcripts
+SPEAKER_PATTERN = re.compile(
+    r"^[ \t]*(?:provider|providert|patient|student|hygienist|parent)[ \t]*(?:\([^)\n]*\))?[ \t]*:",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# Headers of the scored rubric sections, e.g. "Acceptance: Respect Autonomy, Affirmation"
+CATEGORY_PATTERN = re.compile(
+    r"^[ \t]*(?:collaboration|acceptance|compassion|evocation|summary)\b(?![ \t]+of\b)",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# Rough word-piece count used when no tokenizer is available
+_PIECE_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+@dataclass(frozen=True)
+class ChunkingConfig:
+    max_length: int = 128
+    unit: str = "tokens"  # "tokens" or "chars"
+    overlap: int = 16  # carried over from the previous chunk, in the same unit
+    structure: bool = True  # cut at speaker turns and rubric category headers
+
+    def as_dict(self):
+        return asdict(self)
+
+
+# The apps' original chunking: 200-character chunks, no structure, no overlap
+CHAR_CHUNKING = ChunkingConfig(max_length=200, unit="chars", overlap=0, structure=False)
+
+# all-MiniLM-L6-v2 reads at most 256 word pieces; 128 keeps chunks well inside the
+# window and the retrieved context small enough for the feedback prompt.
+TOKEN_CHUNKING = ChunkingConfig()
+
+CHUNKING_MODES = {"tokens": TOKEN_CHUNKING, "chars": CHAR_CHUNKING}
+DEFAULT_CHUNKING = CHUNKING_MODES[os.environ.get("MI_RAG_CHUNKING", "tokens")]
+
+
+@dataclass(frozen=True)
+class Chunk:
+    text: str
+    source: str
+    start: int  # character offsets into the source text
+    end: int
+
+    def as_dict(self):
+        return asdict(self)
+
+
+def approximate_token_length(word):
+    return max(1, len(_PIECE_PATTERN.findall(word)))
+
+
+def tokenizer_length_fn(tokenizer):
+    """Per-word token counter for a Hugging Face tokenizer.
+
+    The MiniLM tokenizer pre-splits on whitespace, so summing per-word counts
+    gives the same total as tokenizing the joined chunk.
+    """
+    if tokenizer is None:
+        return approximate_token_length
+    return lambda word: len(tokenizer.tokenize(word))
+
+
+def _boundaries(text, structure):
+    """Character offsets where a speaker turn (soft) or rubric header (hard) starts."""
+    if not structure:
+        return set(), set()
+    soft = {m.start() + len(m.group(0)) - len(m.group(0).lstrip()) for m in SPEAKER_PATTERN.finditer(text)}
+    hard = {m.start() + len(m.group(0)) - len(m.group(0).lstrip()) for m in CATEGORY_PATTERN.finditer(text)}
+    return soft, hard
+
+
+def iter_chunks(text, source="", config=DEFAULT_CHUNKING, length_fn=None):
+    """Yield ``Chunk`` objects for ``text`` in a single linear pass.
+
+    ``length_fn`` measures one word in ``config.unit`` units; it defaults to
+    ``len`` for characters and to an approximate word-piece count for tokens.
+    """
+    if length_fn is None:
+        length_fn = len if config.unit == "chars" else approximate_token_length
+    separator = 1 if config.unit == "chars" else 0
+    soft, hard = _boundaries(text, config.structure)
+
+    words = []  # (start, end, length) of the words in the current chunk
+    length = 0  # running length of the current chunk, separators included
+    turn_start = 0  # index in ``words`` of the latest speaker turn start
+
+    def emit(count):
+        chunk_text = " ".join(text[s:e] for s, e, _ in words[:count])
+        return Chunk(chunk_text, source, words[0][0], words[count - 1][1])
+
+    def measure(items):
+        return sum(n for _, _, n in items) + separator * max(0, len(items) - 1)
+
+    def overlap_tail(items):
+        # Trailing words of the emitted chunk, up to ``config.overlap`` units
+        tail, size = [], 0
+        for item in reversed(items):
+            size += item[2] + (separator if tail else 0)
+            if size > config.overlap:
+                break
+            tail.append(item)
+        tail.reverse()
+        return tail
+
+    for match in WORD_PATTERN.finditer(text):
+        start, end = match.span()
+        word_length = length_fn(match.group(0))
+
+        if words and start in hard:
+            # Never mix two scored rubric sections in one chunk
+            yield emit(len(words))
+            words, length, turn_start = [], 0, 0
+        elif start in soft:
+            turn_start = len(words)
+
+        added = word_length + (separator if words else 0)
+        if words and length + added > config.max_length:
+            if config.structure and 0 < turn_start <= len(words):
+                # Cut at the last speaker turn and carry the unfinished turn forward
+                yield emit(turn_start)
+                words = words[turn_start:]
+                length = measure(words)
+            if words and length + separator + word_length > config.max_length:
+                # No turn to cut at, or the unfinished turn alone is still too long
+                yield emit(len(words))
+                words = overlap_tail(words) if config.overlap else []
+                length = measure(words)
+                if words and length + separator + word_length > config.max_length:
+                    words, length = [], 0
+            turn_start = 0
+            added = word_length + (separator if words else 0)
+
+        words.append((start, end, word_length))
+        length += added
+
+    if words:
+        yield emit(len(words))
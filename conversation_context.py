@@ -0,0 +1,167 @@
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from scenarios import CHAT_MODEL
+
+# --- Conversation context budgeting ---
+# Each chat turn used to resend the whole chat_history. ConversationContext keeps the
+# prompt under a token budget by folding the oldest turns into a rolling summary.
+# The summary is extended with the newly evicted turns only, never recomputed, and
+# chat_history itself is left untouched so the feedback pass still sees everything.
+# The summary call never sits on the chat path: update() runs it in the background
+# after a reply, while the student types, and the next build() picks up the result.
+
+DEFAULT_BUDGET_TOKENS = int(os.environ.get("MI_CONTEXT_BUDGET_TOKENS", "4000"))
+MESSAGE_OVERHEAD_TOKENS = 4  # role markers and separators per chat message
+
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("MI_SUMMARY_WORKERS", "4")), thread_name_prefix="context-summary"
+)
+
+SUMMARY_PROMPT = """You keep a running summary of a Motivational Interviewing practice conversation between a STUDENT (the provider) and a PATIENT.
+Update the summary with the new turns below. Keep the patient's concerns, feelings, facts about their habits and any plans discussed, and the techniques the student used.
+Write at most 150 words in the third person. Reply with the updated summary only.
+
+Current summary:
+{summary}
+
+New turns:
+{turns}
+"""
+
+
+def count_tokens(text):
+    """Cheap token estimate (~4 characters per token for Llama-style tokenizers)."""
+    return math.ceil(len(text) / 4)
+
+
+def message_tokens(message):
+    return count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def format_turns(messages, user_label="STUDENT", assistant_label="PATIENT"):
+    return "\n".join(
+        f"{user_label if msg['role'] == 'user' else assistant_label}: {msg['content']}" for msg in messages
+    )
+
+
+def make_llm_summarizer(client, model=CHAT_MODEL):
+    def summarize(summary, turns):
+        response = client.chat.completions.create(
+            model=model,
+            temperature=0,
+            messages=[{
+                "role": "user",
+                "content": SUMMARY_PROMPT.format(summary=summary or "(none yet)", turns=format_turns(turns)),
+            }],
+        )
+        return response.choices[0].message.content.strip()
+    return summarize
+
+
+class ConversationContext:
+    """Build the per-turn message list, keeping it under ``budget_tokens``.
+
+    The budget is a soft target. Eviction is planned after each reply and counts the
+    student's next message at the length of their last one, but the summary runs in
+    the background and only applies once finished, the latest exchange is never
+    summarized, and a prefix that nearly fills the budget is summarized in batches.
+    A prompt can therefore exceed the budget for a turn or two.
+
+    ``state`` is a plain dict (e.g. ``st.session_state.context_state``) holding the
+    rolling summary, how many chat_history messages it covers, and the cached
+    token count of every message so each message is only measured once.
+    """
+
+    def __init__(self, summarize, budget_tokens=DEFAULT_BUDGET_TOKENS, keep_recent=6, target_ratio=0.75):
+        self.summarize = summarize
+        self.budget_tokens = budget_tokens
+        self.keep_recent = keep_recent
+        # After summarizing, aim below the budget so the next few turns don't summarize again
+        self.target_tokens = int(budget_tokens * target_ratio)
+
+    @staticmethod
+    def new_state():
+        # "pending" is the in-flight background summary, a Future of (summary, summarized_upto)
+        return {"summary": "", "summarized_upto": 0, "token_counts": [], "pending": None}
+
+    def _token_counts(self, chat_history, state):
+        counts = state["token_counts"]
+        for message in chat_history[len(counts):]:
+            counts.append(message_tokens(message))
+        return counts
+
+    def summary_message(self, state):
+        if not state["summary"]:
+            return None
+        return {"role": "system", "content": f"Summary of the earlier part of this conversation:\n{state['summary']}"}
+
+    def _apply_pending(self, state):
+        pending = state.get("pending")
+        if pending is None or not pending.done():
+            return
+        state["pending"] = None
+        if pending.exception() is None:
+            state["summary"], state["summarized_upto"] = pending.result()
+        # A failed summary is dropped; the next update() tries again
+
+    def plan_eviction(self, prefix_messages, chat_history, state):
+        """Index the summary should cover up to, or None when nothing needs summarizing."""
+        counts = self._token_counts(chat_history, state)
+        fixed = sum(message_tokens(message) for message in prefix_messages)
+        summary = self.summary_message(state)
+        upto = state["summarized_upto"]
+        # The student's next message is not in chat_history yet; assume it is as long
+        # as their last one
+        incoming = next((counts[i] for i in reversed(range(len(chat_history))) if chat_history[i]["role"] == "user"), 0)
+        total = fixed + (message_tokens(summary) if summary else 0) + sum(counts[upto:]) + incoming
+        if total <= self.budget_tokens:
+            return None
+
+        # Evict down to target_tokens in one pass: keep the last keep_recent messages if
+        # that is enough, otherwise everything but the latest exchange
+        new_upto = upto
+        for last_evictable in (len(chat_history) - self.keep_recent, len(chat_history) - 2):
+            while new_upto < last_evictable and total > self.target_tokens:
+                total -= counts[new_upto]
+                new_upto += 1
+        if total > self.target_tokens and new_upto - upto < self.keep_recent:
+            # The prefix alone nearly fills the budget: summarize in batches of keep_recent
+            # messages rather than on every turn
+            return None
+        return new_upto if new_upto > upto else None
+
+    def update(self, prefix_messages, chat_history, state, wait=False):
+        """Fold the oldest turns into the summary if the next prompt would exceed the budget.
+
+        Call it after a reply has been added. The summary runs on a background thread
+        (one at a time per conversation) unless ``wait`` is true.
+        """
+        self._apply_pending(state)
+        if state.get("pending") is not None:
+            return
+        new_upto = self.plan_eviction(prefix_messages, chat_history, state)
+        if new_upto is None:
+            return
+        evicted = chat_history[state["summarized_upto"]:new_upto]
+        previous = state["summary"]
+        state["pending"] = _executor.submit(lambda: (self.summarize(previous, evicted), new_upto))
+        if wait:
+            state["pending"].exception()
+            self._apply_pending(state)
+
+    def build(self, prefix_messages, chat_history, state):
+        """The next request's messages. Never calls the LLM; a background summary that
+        has finished since the last turn is used, one still running is not waited for."""
+        self._apply_pending(state)
+        self._token_counts(chat_history, state)
+        messages = list(prefix_messages)
+        summary = self.summary_message(state)
+        if summary:
+            messages.append(summary)
+        messages.extend(chat_history[state["summarized_upto"]:])
+        return messages
+
+    def prompt_tokens(self, messages):
+        return sum(message_tokens(message) for message in messages)
@@ -0,0 +1,113 @@
+import os
+
+import numpy as np
+
+# --- Embedding backends ---
+# The rubric engine only needs ``encode(texts) -> float32 matrix``, a ``name`` for the
+# cache keys and, for token-based chunking, a ``tokenizer``. Each backend imports its
+# heavy dependencies when it is constructed, never at module import time.
+#
+#   MI_EMBEDDING_BACKEND=sentence-transformers   (default) torch + sentence-transformers
+#   MI_EMBEDDING_BACKEND=onnx                    onnxruntime + tokenizers, no torch;
+#                                                MI_EMBEDDING_ONNX_DIR holds model.onnx
+#                                                (or MI_EMBEDDING_ONNX_FILE, e.g. a
+#                                                quantized export) and tokenizer.json
+#   MI_EMBEDDING_BACKEND=precomputed             no model at all: only vectors already in
+#                                                the embedding cache (see embedding_cache.py)
+
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+EMBEDDING_DIMENSION = 384  # for all-MiniLM-L6-v2
+MAX_SEQUENCE_LENGTH = 256
+
+
+class EmbeddingUnavailable(RuntimeError):
+    """Raised when a backend cannot embed new text (precomputed-vectors-only mode)."""
+
+
+class SentenceTransformerBackend:
+    def __init__(self, model_name=EMBEDDING_MODEL_NAME):
+        from sentence_transformers import SentenceTransformer
+
+        self.name = model_name
+        self.model = SentenceTransformer(model_name)
+        self.tokenizer = getattr(self.model, "tokenizer", None)
+
+    def encode(self, texts):
+        return np.asarray(self.model.encode(list(texts)), dtype="float32")
+
+
+class _OnnxTokenizer:
+    # Just enough of the Hugging Face tokenizer API for chunking.tokenizer_length_fn
+    def __init__(self, tokenizer):
+        self._tokenizer = tokenizer
+
+    def tokenize(self, text):
+        return self._tokenizer.encode(text, add_special_tokens=False).tokens
+
+
+class OnnxBackend:
+    """MiniLM exported to ONNX (optionally quantized): mean pooling + L2 norm, like the original."""
+
+    def __init__(self, model_dir, model_file="model.onnx", batch_size=32):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        self.name = EMBEDDING_MODEL_NAME if model_file == "model.onnx" else f"{EMBEDDING_MODEL_NAME}/{model_file}"
+        self.batch_size = batch_size
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, model_file), providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        tokenizer.enable_truncation(MAX_SEQUENCE_LENGTH)
+        tokenizer.enable_padding()
+        self._batch_tokenizer = tokenizer
+        self.tokenizer = _OnnxTokenizer(Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json")))
+
+    def encode(self, texts):
+        texts = list(texts)
+        batches = []
+        for start in range(0, len(texts), self.batch_size):
+            encodings = self._batch_tokenizer.encode_batch(texts[start:start + self.batch_size])
+            input_ids = np.array([encoding.ids for encoding in encodings], dtype="int64")
+            attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype="int64")
+            feed = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if "token_type_ids" in self._input_names:
+                feed["token_type_ids"] = np.array([encoding.type_ids for encoding in encodings], dtype="int64")
+
+            token_embeddings = self.session.run(None, feed)[0]
+            mask = attention_mask[:, :, None].astype("float32")
+            pooled = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+            pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+            batches.append(pooled.astype("float32"))
+        if not batches:
+            return np.zeros((0, EMBEDDING_DIMENSION), dtype="float32")
+        return np.concatenate(batches)
+
+
+class PrecomputedBackend:
+    """No model: every vector must come from the on-disk embedding cache."""
+
+    tokenizer = None
+
+    def __init__(self, model_name=EMBEDDING_MODEL_NAME):
+        self.name = model_name
+
+    def encode(self, texts):
+        raise EmbeddingUnavailable(
+            "precomputed embedding mode cannot embed new text; "
+            "run `python embedding_cache.py <rubric dirs>` with a model-backed backend first"
+        )
+
+
+def create_backend(kind=None):
+    kind = kind or os.environ.get("MI_EMBEDDING_BACKEND", "sentence-transformers")
+    if kind == "onnx":
+        return OnnxBackend(
+            os.environ["MI_EMBEDDING_ONNX_DIR"],
+            os.environ.get("MI_EMBEDDING_ONNX_FILE", "model.onnx"),
+        )
+    if kind == "precomputed":
+        return PrecomputedBackend(os.environ.get("MI_EMBEDDING_MODEL_KEY", EMBEDDING_MODEL_NAME))
+    return SentenceTransformerBackend()
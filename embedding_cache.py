@@ -0,0 +1,187 @@
+import argparse
+import hashlib
+import json
+import os
+
+import faiss
+import numpy as np
+
+# --- On-disk cache for rubric chunks, embeddings and FAISS indexes ---
+# Every rubric file is cached under a key built from its content hash, the chunking
+# parameters and the embedding model name, so a cold start only re-embeds files that
+# changed. Embedding matrices are stored as float32 .npy files and memory-mapped back.
+# Query embeddings (the MI category queries) are kept per model as well, which is what
+# lets the precomputed embedding backend run without any model loaded. The BM25
+# postings arrays (lexical_index.py) are stored next to the FAISS index.
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "MI_RAG_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".rag_cache"),
+)
+
+
+def file_cache_key(content, model_name, chunk_params):
+    digest = hashlib.sha256()
+    digest.update(content)
+    digest.update(json.dumps({"model": model_name, "chunking": chunk_params}, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def corpus_cache_key(files, tag):
+    """Key for a whole-corpus artifact (FAISS index, BM25 arrays).
+
+    ``files`` are ``(name, file key)`` pairs in the order vector ids were handed out.
+    The order is hashed as is: the same files under names that sort differently get
+    different ids, so the stored index must not be reused for them.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps({"files": [list(pair) for pair in files], "tag": tag}).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _atomic_write(path, write):
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+class EmbeddingCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.files_dir = os.path.join(cache_dir, "files")
+        self.index_dir = os.path.join(cache_dir, "index")
+        self.queries_dir = os.path.join(cache_dir, "queries")
+
+    def _ensure_dirs(self):
+        os.makedirs(self.files_dir, exist_ok=True)
+        os.makedirs(self.index_dir, exist_ok=True)
+        os.makedirs(self.queries_dir, exist_ok=True)
+
+    # --- Per-file chunks + embeddings ---
+    def load_file(self, key):
+        chunks_path = os.path.join(self.files_dir, f"{key}.json")
+        vectors_path = os.path.join(self.files_dir, f"{key}.npy")
+        if not (os.path.exists(chunks_path) and os.path.exists(vectors_path)):
+            return None
+        try:
+            with open(chunks_path, "r", encoding="utf-8") as f:
+                chunks = json.load(f)
+            embeddings = np.load(vectors_path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        if len(chunks) != embeddings.shape[0]:
+            return None
+        return chunks, embeddings
+
+    def save_file(self, key, chunks, embeddings):
+        try:
+            self._ensure_dirs()
+            embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+
+            def write_chunks(path):
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump(chunks, f)
+
+            def write_vectors(path):
+                with open(path, "wb") as f:
+                    np.save(f, embeddings)
+
+            _atomic_write(os.path.join(self.files_dir, f"{key}.npy"), write_vectors)
+            _atomic_write(os.path.join(self.files_dir, f"{key}.json"), write_chunks)
+        except OSError:
+            # A read-only deploy still works, it just re-embeds on the next cold start
+            pass
+
+    # --- Query embeddings, per model ---
+    def _queries_path(self, model_name):
+        return os.path.join(self.queries_dir, hashlib.sha256(model_name.encode("utf-8")).hexdigest())
+
+    def load_queries(self, model_name):
+        path = self._queries_path(model_name)
+        try:
+            with open(f"{path}.json", "r", encoding="utf-8") as f:
+                texts = json.load(f)
+            vectors = np.load(f"{path}.npy")
+        except (OSError, ValueError):
+            return {}
+        if len(texts) != len(vectors):
+            return {}
+        return dict(zip(texts, vectors))
+
+    def save_queries(self, model_name, queries):
+        try:
+            self._ensure_dirs()
+            path = self._queries_path(model_name)
+            texts = list(queries)
+            vectors = np.stack([queries[text] for text in texts]).astype("float32") if texts else np.zeros((0, 0), "float32")
+
+            def write_texts(tmp_path):
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(texts, f)
+
+            def write_vectors(tmp_path):
+                with open(tmp_path, "wb") as f:
+                    np.save(f, vectors)
+
+            _atomic_write(f"{path}.npy", write_vectors)
+            _atomic_write(f"{path}.json", write_texts)
+        except OSError:
+            pass
+
+    # --- Serialized FAISS index for a whole corpus ---
+    def load_index(self, key):
+        path = os.path.join(self.index_dir, f"{key}.faiss")
+        if not os.path.exists(path):
+            return None
+        try:
+            return faiss.read_index(path)
+        except RuntimeError:
+            return None
+
+    def save_index(self, key, index):
+        try:
+            self._ensure_dirs()
+            _atomic_write(os.path.join(self.index_dir, f"{key}.faiss"), lambda path: faiss.write_index(index, path))
+        except (OSError, RuntimeError):
+            pass
+
+    # --- BM25 postings arrays for a whole corpus ---
+    def load_lexical(self, key):
+        path = os.path.join(self.index_dir, f"{key}.bm25.npz")
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                return {name: data[name] for name in data.files}
+        except (OSError, ValueError):
+            return None
+
+    def save_lexical(self, key, arrays):
+        def write(path):
+            with open(path, "wb") as f:
+                np.savez(f, **arrays)
+
+        try:
+            self._ensure_dirs()
+            _atomic_write(os.path.join(self.index_dir, f"{key}.bm25.npz"), write)
+        except OSError:
+            pass
+
+
+def main():
+    # Build step: python embedding_cache.py ohi_rubrics hpv_rubrics
+    from rag_engine import RubricRAGEngine
+
+    parser = argparse.ArgumentParser(description="Pre-build the rubric embedding cache.")
+    parser.add_argument("rubric_dirs", nargs="+")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    args = parser.parse_args()
+
+    cache = EmbeddingCache(args.cache_dir)
+    for rubrics_dir in args.rubric_dirs:
+        engine = RubricRAGEngine(rubrics_dir, cache=cache)
+        print(json.dumps(engine.stats()))
+
+
+if __name__ == "__main__":
+    main()
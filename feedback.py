@@ -0,0 +1,167 @@
+# --- Post-session MI feedback ---
+# Builds the transcript, the per-category rubric context and the review prompt for
+# the "Finish Session & Get Feedback" call, so the apps and batch_grade.py send
+# exactly the same request for the same conversation.
+#
+# With MI_COMPACT_FEEDBACK=1 the app prepares each student turn in the background as
+# soon as it is sent: precompute_turn() MITI-codes the turn, embeds it and reruns the
+# per-category rubric retrieval for the transcript so far. The feedback request then
+# assembles a compact review prompt from those entries: coded student turns, patient
+# replies cut to their opening words and the chunks already retrieved. Nothing is
+# sent to the LLM early; the evaluation itself still runs when the button is pressed,
+# only on a shorter prompt.
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import tracing
+from scenarios import CHAT_MODEL
+from turn_annotations import LABELS, annotate, classify_turn, summarize
+
+COMPACT_FEEDBACK = os.environ.get("MI_COMPACT_FEEDBACK", "0") == "1"
+PATIENT_WORDS = 12  # patient replies in the compact transcript are cut to this many words
+
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("MI_PRECOMPUTE_WORKERS", "2")), thread_name_prefix="feedback-precompute"
+)
+
+
+def format_transcript(chat_history, scenario):
+    return "\n".join(
+        f"{scenario.student_label}: {msg['content']}" if msg["role"] == "user"
+        else f"{scenario.patient_label}: {msg['content']}"
+        for msg in chat_history
+    )
+
+
+def build_rag_context(rag_engine, chat_history, annotations=None):
+    # Rubric examples per MI category, based on what the student actually said;
+    # turns embedded in advance by precompute_turn() are not embedded again
+    annotations = annotations or {}
+    turns = [(index, msg["content"]) for index, msg in enumerate(chat_history) if msg["role"] == "user"]
+    with tracing.span("rag.retrieve_for_feedback"):
+        retrieved_info = rag_engine.retrieve_for_feedback(
+            [text for _, text in turns],
+            turn_vectors=[annotations.get(index, {}).get("vector") for index, _ in turns],
+        )
+    return "\n\n".join(
+        f"{category}:\n" + "\n".join(chunks) for category, chunks in retrieved_info.items() if chunks
+    )
+
+
+def format_compact_transcript(chat_history, scenario, annotations):
+    # Student lines carry their behaviour codes, e.g. "STUDENT [open question]: ...";
+    # patient lines only keep their opening words as context
+    lines = []
+    for index, msg in enumerate(chat_history):
+        if msg["role"] != "user":
+            words = msg["content"].split()
+            opening = " ".join(words[:PATIENT_WORDS]) + (" …" if len(words) > PATIENT_WORDS else "")
+            lines.append(f"{scenario.patient_label}: {opening}")
+            continue
+        codes = [LABELS[label] for label in annotations.get(index, {}).get("labels", [])]
+        lines.append(f"{scenario.student_label}{' [' + ', '.join(codes) + ']' if codes else ''}: {msg['content']}")
+    return "\n".join(lines)
+
+
+def format_annotation_summary(annotations):
+    summary = summarize(annotations)
+    counts = ", ".join(f"{LABELS[label]}: {count}" for label, count in summary["counts"].items() if count) or "none"
+    lines = [
+        f"Patient replies are shortened to their first {PATIENT_WORDS} words.",
+        f"Automatic turn coding (may contain errors) over {summary['turns']} student turns: {counts}.",
+    ]
+    if summary["percent_open_questions"] is not None:
+        lines.append(
+            f"Open questions: {summary['percent_open_questions']}% of questions; "
+            f"reflection-to-question ratio: {summary['reflection_to_question_ratio']}."
+        )
+    return "\n".join(lines)
+
+
+def build_review_prompt(scenario, transcript, rag_context):
+    sections = [f"{scenario.review_intro}\n{transcript}"]
+    if scenario.review_note:
+        sections.append(scenario.review_note)
+    sections.append(f"Relevant MI Knowledge:\n{rag_context}")
+    sections.append(scenario.review_request)
+    return "\n\n".join(sections) + "\n"
+
+
+def feedback_request(scenario, chat_history, rag_engine, model=CHAT_MODEL, precomputed=None):
+    """Keyword arguments for ``client.chat.completions.create`` for one transcript.
+
+    temperature=0 makes the report reproducible, so re-requesting feedback for an
+    unchanged transcript is answered from the response cache. With ``precomputed``
+    (the state filled by ``precompute_turn``) the prompt is the compact, coded
+    transcript and the rubric context retrieved in the background is reused.
+    """
+    if precomputed is None:
+        transcript = format_transcript(chat_history, scenario)
+        rag_context = build_rag_context(rag_engine, chat_history)
+    else:
+        annotations = annotate(chat_history, precomputed["turns"])
+        transcript = format_compact_transcript(chat_history, scenario, annotations)
+        transcript += "\n\n" + format_annotation_summary(annotations)
+        ready = precomputed["rag_context"] is not None and precomputed["rag_upto"] == max(annotations, default=None)
+        tracing.record_cache("feedback_context", ready)
+        if ready:
+            rag_context = precomputed["rag_context"]
+        else:
+            rag_context = build_rag_context(rag_engine, chat_history, precomputed["turns"])
+    review_prompt = build_review_prompt(scenario, transcript, rag_context)
+    return {
+        "model": model,
+        "temperature": 0,
+        "messages": [
+            {"role": "system", "content": scenario.evaluator_prompt},
+            {"role": "user", "content": review_prompt},
+        ],
+    }
+
+
+# --- Per-turn precomputation ---
+
+def new_precompute_state():
+    return {
+        "turns": {},  # chat_history index -> {"labels": [...], "vector": ...}
+        "rag_context": None,  # rubric context for the student turns up to rag_upto
+        "rag_upto": None,
+        "pending": None,  # Future of the latest precompute_turn job
+    }
+
+
+def precompute_turn(state, chat_history, get_rag_engine):
+    """Code, embed and retrieve for the student turn at the end of ``chat_history``
+    in the background.
+
+    Jobs for one session run in turn order: each waits for the previous one, so the
+    retrieval sees the vectors of every earlier turn.
+    """
+    snapshot = [dict(message) for message in chat_history]
+    state["pending"] = _executor.submit(_precompute_turn, state, snapshot, get_rag_engine, state["pending"])
+    return state["pending"]
+
+
+def _precompute_turn(state, chat_history, get_rag_engine, previous):
+    if previous is not None:
+        previous.exception()
+    index = len(chat_history) - 1
+    text = chat_history[index]["content"]
+    with tracing.span("feedback.precompute_turn", turn=index) as turn_span:
+        entry = {"labels": classify_turn(text)}
+        state["turns"][index] = entry
+        try:
+            rag_engine = get_rag_engine()
+            entry["vector"] = rag_engine.embed_turn(text)
+            state["rag_context"] = build_rag_context(rag_engine, chat_history, state["turns"])
+            state["rag_upto"] = index
+        except Exception as error:
+            # The feedback request embeds and retrieves for this turn itself
+            turn_span.set(error=type(error).__name__)
+
+
+def wait_for_precompute(state):
+    """Wait for the last ``precompute_turn`` job (and so all earlier ones) to finish."""
+    if state["pending"] is not None:
+        state["pending"].exception()
@@ -0,0 +1,144 @@
+import json
+import re
+
+import numpy as np
+
+# --- BM25 inverted index over rubric chunks ---
+# Rubric feedback hinges on exact MI terms ("open-ended question", "change talk",
+# "affirmation", "Met / Partially Met") that sentence embeddings tend to blur, so the
+# rag engine keeps a lexical index next to the FAISS one and fuses both rankings.
+#
+# Postings are stored CSR-style in flat numpy arrays: the postings of term t are
+# doc_positions[offsets[t]:offsets[t + 1]] with matching term_freqs. Scoring a query
+# touches only the postings of its terms, and the whole index round-trips through
+# one .npz file in the embedding cache.
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by do for from had has have he her him his i if in is it its
+me my of on or our she so that the their them they this to was we were what when which
+who will with you your
+""".split())
+
+
+def tokenize(text):
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """Fuse ranked id lists; returns ``[(id, score), ...]`` best first."""
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda pair: -pair[1])
+
+
+class BM25Index:
+    def __init__(self, vocabulary, offsets, doc_positions, term_freqs, doc_lengths, doc_ids, k1=1.2, b=0.75):
+        self.vocabulary = vocabulary  # term -> term id
+        self.offsets = offsets
+        self.doc_positions = doc_positions
+        self.term_freqs = term_freqs
+        self.doc_lengths = doc_lengths
+        self.doc_ids = doc_ids  # doc position -> engine chunk id
+        self.k1 = k1
+        self.b = b
+
+        num_docs = len(doc_ids)
+        doc_freqs = np.diff(offsets).astype("float32")
+        self.idf = np.log1p((num_docs - doc_freqs + 0.5) / (doc_freqs + 0.5)).astype("float32")
+        average_length = float(doc_lengths.mean()) if num_docs else 1.0
+        # Per-document part of the BM25 denominator, computed once
+        self._length_norm = (k1 * (1 - b + b * doc_lengths / max(average_length, 1e-9))).astype("float32")
+
+    @classmethod
+    def build(cls, documents, k1=1.2, b=0.75):
+        """``documents`` is an iterable of ``(chunk id, text)``."""
+        vocabulary, doc_ids, doc_lengths = {}, [], []
+        term_ids, positions, counts = [], [], []
+        for position, (doc_id, text) in enumerate(documents):
+            tokens = tokenize(text)
+            doc_ids.append(doc_id)
+            doc_lengths.append(len(tokens))
+            frequencies = {}
+            for token in tokens:
+                term = vocabulary.setdefault(token, len(vocabulary))
+                frequencies[term] = frequencies.get(term, 0) + 1
+            term_ids.extend(frequencies)
+            positions.extend([position] * len(frequencies))
+            counts.extend(frequencies.values())
+
+        term_ids = np.asarray(term_ids, dtype="int32")
+        order = np.argsort(term_ids, kind="stable")  # group postings by term, docs stay ascending
+        offsets = np.zeros(len(vocabulary) + 1, dtype="int64")
+        np.cumsum(np.bincount(term_ids, minlength=len(vocabulary)), out=offsets[1:])
+        return cls(
+            vocabulary,
+            offsets,
+            np.asarray(positions, dtype="int32")[order],
+            np.asarray(counts, dtype="float32")[order],
+            np.asarray(doc_lengths, dtype="float32"),
+            np.asarray(doc_ids, dtype="int64"),
+            k1,
+            b,
+        )
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def search(self, query, top_k=10):
+        """Return ``(chunk id, score)`` pairs, best first; only documents sharing a term."""
+        terms = {self.vocabulary[token] for token in tokenize(query) if token in self.vocabulary}
+        if not terms or not len(self.doc_ids):
+            return []
+        scores = np.zeros(len(self.doc_ids), dtype="float32")
+        for term in terms:
+            start, end = self.offsets[term], self.offsets[term + 1]
+            docs = self.doc_positions[start:end]
+            freqs = self.term_freqs[start:end]
+            scores[docs] += self.idf[term] * freqs * (self.k1 + 1) / (freqs + self._length_norm[docs])
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > top_k:
+            matched = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+        matched = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(int(self.doc_ids[position]), float(scores[position])) for position in matched]
+
+    def to_arrays(self):
+        terms = sorted(self.vocabulary, key=self.vocabulary.get)
+        return {
+            "terms": np.frombuffer(json.dumps(terms).encode("utf-8"), dtype="uint8"),
+            "offsets": self.offsets,
+            "doc_positions": self.doc_positions,
+            "term_freqs": self.term_freqs,
+            "doc_lengths": self.doc_lengths,
+            "doc_ids": self.doc_ids,
+            "params": np.array([self.k1, self.b], dtype="float64"),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        terms = json.loads(arrays["terms"].tobytes().decode("utf-8"))
+        k1, b = arrays["params"]
+        return cls(
+            {term: term_id for term_id, term in enumerate(terms)},
+            arrays["offsets"],
+            arrays["doc_positions"],
+            arrays["term_freqs"],
+            arrays["doc_lengths"],
+            arrays["doc_ids"],
+            float(k1),
+            float(b),
+        )
+
+    def stats(self):
+        return {
+            "documents": len(self.doc_ids),
+            "terms": len(self.vocabulary),
+            "postings": int(len(self.doc_positions)),
+            "bytes": int(sum(array.nbytes for array in (
+                self.offsets, self.doc_positions, self.term_freqs, self.doc_lengths, self.doc_ids
+            ))),
+        }
@@ -0,0 +1,517 @@
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+
+import tracing
+from response_cache import ResponseCache, cache_key, is_cacheable
+
+# --- Shared LLM client layer ---
+# One client per API key, cached for the life of the process so Streamlit reruns reuse
+# its keep-alive connection pool. Every call goes through a per-key token bucket that
+# follows Groq's x-ratelimit-* headers, and 429s / timeouts / 5xx errors are retried
+# with jittered exponential backoff. LLMClient mirrors client.chat.completions.create,
+# so the rest of the app does not care whether it talks to Groq or the fake backend.
+
+DEFAULT_TIMEOUT_SECONDS = float(os.environ.get("MI_LLM_TIMEOUT_SECONDS", "60"))
+DEFAULT_MAX_RETRIES = int(os.environ.get("MI_LLM_MAX_RETRIES", "3"))
+# Longest a call may sit in the rate limiter or wait on a retry-after before it fails;
+# defaults to the request timeout, so a spent daily quota errors instead of hanging
+DEFAULT_MAX_WAIT_SECONDS = os.environ.get("MI_LLM_MAX_WAIT_SECONDS")
+
+# Groq free-tier limits for llama-3.1-8b-instant; the response headers correct these
+DEFAULT_REQUESTS_PER_MINUTE = float(os.environ.get("MI_LLM_REQUESTS_PER_MINUTE", "30"))
+DEFAULT_TOKENS_PER_MINUTE = float(os.environ.get("MI_LLM_TOKENS_PER_MINUTE", "6000"))
+
+MAX_CACHED_CLIENTS = 128
+
+_clients = OrderedDict()
+_clients_lock = threading.Lock()
+
+# Shared by every client: a cached reply only depends on the request, not on the key
+_response_cache = ResponseCache()
+
+# Cacheable requests currently being generated, by cache key; a second identical
+# request (e.g. a double-clicked "Finish Session") follows the first one
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+class RateLimitWaitTooLong(Exception):
+    """The rate limit frees up later than the caller is willing to wait."""
+
+    def __init__(self, wait_seconds, max_wait):
+        super().__init__(f"rate limit resets in {wait_seconds:.1f}s, longer than the {max_wait:.1f}s allowed")
+        self.wait_seconds = wait_seconds
+
+
+def parse_reset_seconds(value):
+    """Parse Groq reset values such as "7.66s", "2m59.56s", "120ms" or "1h2m"."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    total, matched = 0.0, False
+    for amount, unit in re.findall(r"([\d.]+)(ms|h|m|s)", value):
+        matched = True
+        total += float(amount) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+    return total if matched else None
+
+
+def estimate_tokens(messages, max_tokens=None):
+    prompt = sum(len(message.get("content") or "") for message in messages) // 4
+    return prompt + (max_tokens or 0)
+
+
+class TokenBucket:
+    """Continuously refilling bucket; ``acquire`` blocks until enough capacity is free."""
+
+    def __init__(self, capacity, refill_per_second):
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self.tokens = float(capacity)
+        self.blocked_until = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.refill_per_second)
+        self._updated = now
+
+    def acquire(self, amount=1.0, max_wait=None):
+        amount = min(float(amount), self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                wait = max(self.blocked_until - now, (amount - self.tokens) / self.refill_per_second)
+            if max_wait is not None and waited + wait > max_wait:
+                raise RateLimitWaitTooLong(waited + wait, max_wait)
+            time.sleep(wait)
+            waited += wait
+
+    def observe(self, remaining=None, reset_seconds=None):
+        """Align the bucket with what the server says is left."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if remaining is not None:
+                self.tokens = min(self.tokens, float(remaining))
+                if remaining <= 0 and reset_seconds:
+                    self.blocked_until = max(self.blocked_until, now + reset_seconds)
+
+    def pause(self, seconds):
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class RateLimiter:
+    def __init__(self, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE):
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+
+    def acquire(self, estimated_tokens, max_wait=None):
+        waited = self.requests.acquire(1, max_wait)
+        return waited + self.tokens.acquire(estimated_tokens, None if max_wait is None else max_wait - waited)
+
+    def observe(self, headers):
+        if not headers:
+            return
+        for bucket, kind in ((self.requests, "requests"), (self.tokens, "tokens")):
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            if remaining is not None:
+                try:
+                    remaining = float(remaining)
+                except ValueError:
+                    continue
+                bucket.observe(remaining, parse_reset_seconds(headers.get(f"x-ratelimit-reset-{kind}")))
+
+    def pause(self, seconds):
+        self.requests.pause(seconds)
+
+
+def completion_response(text, usage=None):
+    message = SimpleNamespace(role="assistant", content=text)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=usage)
+
+
+def completion_chunk(text=None, finish_reason=None, usage=None):
+    chunk = SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text), finish_reason=finish_reason)])
+    if usage is not None:
+        chunk.x_groq = SimpleNamespace(usage=usage)
+    return chunk
+
+
+# --- Backends ---
+
+class GroqBackend:
+    """Groq SDK on a keep-alive httpx pool; the SDK's own retries are off, LLMClient retries."""
+
+    def __init__(self, api_key, timeout=DEFAULT_TIMEOUT_SECONDS, base_url=None, max_connections=20):
+        import groq
+        import httpx
+
+        self._groq = groq
+        self.http_client = httpx.Client(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=120,
+            ),
+        )
+        self.client = groq.Groq(
+            api_key=api_key,
+            base_url=base_url,
+            timeout=timeout,
+            max_retries=0,
+            http_client=self.http_client,
+        )
+
+    def create(self, **kwargs):
+        raw = self.client.chat.completions.with_raw_response.create(**kwargs)
+        return raw.parse(), raw.headers
+
+    def is_retryable(self, error):
+        if isinstance(error, (self._groq.APITimeoutError, self._groq.APIConnectionError)):
+            return True
+        if isinstance(error, self._groq.APIStatusError):
+            return error.status_code in (408, 409, 429) or error.status_code >= 500
+        return False
+
+    def error_headers(self, error):
+        response = getattr(error, "response", None)
+        return response.headers if response is not None else {}
+
+    def close(self):
+        self.http_client.close()
+
+
+class FakeAPIError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"fake API error {status_code}")
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeBackend:
+    """Offline stand-in for Groq with configurable latency, token rate and 429s."""
+
+    def __init__(self, reply="Hmm, I'm not really sure about that yet...", latency=0.0,
+                 tokens_per_second=None, rate_limit_first=0, retry_after=0.0, error_rate=0.0, seed=None):
+        self.reply = reply
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.rate_limit_first = rate_limit_first
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self.calls = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _reply_for(self, kwargs):
+        return self.reply(kwargs) if callable(self.reply) else self.reply
+
+    def _usage(self, kwargs, text):
+        prompt_tokens = estimate_tokens(kwargs.get("messages", []))
+        completion_tokens = max(1, len(text) // 4)
+        return SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                               total_tokens=prompt_tokens + completion_tokens)
+
+    def _stream(self, text, kwargs):
+        words = re.findall(r"\S+\s*", text)
+        for word in words:
+            if self.tokens_per_second:
+                time.sleep(1.0 / self.tokens_per_second)
+            yield completion_chunk(word)
+        yield completion_chunk(finish_reason="stop", usage=self._usage(kwargs, text))
+
+    def create(self, **kwargs):
+        with self._lock:
+            self.calls.append(kwargs)
+            call_number = len(self.calls)
+            fail = call_number <= self.rate_limit_first or self._random.random() < self.error_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise FakeAPIError(429, {"retry-after": str(self.retry_after)})
+
+        headers = {"x-ratelimit-remaining-requests": "1000", "x-ratelimit-remaining-tokens": "100000"}
+        text = self._reply_for(kwargs)
+        if kwargs.get("stream"):
+            return self._stream(text, kwargs), headers
+        if self.tokens_per_second:
+            time.sleep(len(text.split()) / self.tokens_per_second)
+        return completion_response(text, self._usage(kwargs, text)), headers
+
+    def is_retryable(self, error):
+        return isinstance(error, FakeAPIError) and (error.status_code == 429 or error.status_code >= 500)
+
+    def error_headers(self, error):
+        return error.headers
+
+    def close(self):
+        pass
+
+
+# --- Client ---
+
+class _InFlight:
+    """One cacheable generation, shared by every caller that asks for it meanwhile.
+
+    A stream is read to the end on its own thread, so the reply still lands in the
+    cache when the caller that started it goes away mid-stream (a Streamlit rerun).
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self._condition = threading.Condition()
+
+    def add(self, chunk):
+        with self._condition:
+            self.chunks.append(chunk)
+            self._condition.notify_all()
+
+    def finish(self, error=None):
+        with self._condition:
+            self.error = error
+            self.done = True
+            self._condition.notify_all()
+
+    def pump(self, stream, on_done):
+        def run():
+            try:
+                for chunk in stream:
+                    self.add(chunk)
+                self.finish()
+            except Exception as error:
+                self.finish(error)
+            on_done(self)
+        threading.Thread(target=run, name="llm-stream", daemon=True).start()
+
+    def text(self):
+        """The full reply once it completed, else None."""
+        parts, finished = [], False
+        for chunk in self.chunks:
+            if chunk.choices:
+                choice = chunk.choices[0]
+                if choice.delta.content:
+                    parts.append(choice.delta.content)
+                finished = finished or choice.finish_reason == "stop"
+        return "".join(parts) if finished else None
+
+    def follow(self, replay=False):
+        # Followers get the text only, so token usage is counted once, by the first caller
+        position = 0
+        while True:
+            with self._condition:
+                while position >= len(self.chunks) and not self.done:
+                    self._condition.wait()
+                if position >= len(self.chunks):
+                    if self.error is not None:
+                        raise self.error
+                    return
+                chunk = self.chunks[position]
+                position += 1
+            if not replay:
+                yield chunk
+            elif chunk.choices:
+                choice = chunk.choices[0]
+                yield completion_chunk(choice.delta.content, choice.finish_reason)
+
+    def wait(self):
+        with self._condition:
+            while not self.done:
+                self._condition.wait()
+        if self.error is not None:
+            raise self.error
+        return self.text()
+
+
+class _Completions:
+    def __init__(self, client):
+        self._client = client
+
+    def create(self, **kwargs):
+        return self._client.create(**kwargs)
+
+
+class LLMClient:
+    """Drop-in for ``Groq()`` exposing ``client.chat.completions.create(...)``."""
+
+    def __init__(self, backend, rate_limiter=None, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff_base=0.5, backoff_cap=8.0, cache=None, max_wait=DEFAULT_TIMEOUT_SECONDS):
+        self.backend = backend
+        self.cache = cache
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.max_wait = max_wait
+        self.chat = SimpleNamespace(completions=_Completions(self))
+
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "retries": 0, "errors": 0, "rate_limit_wait_seconds": 0.0}
+
+    def _backoff(self, attempt, headers):
+        # Full jitter, but never earlier than the server's retry-after
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+        retry_after = parse_reset_seconds((headers or {}).get("retry-after"))
+        return max(delay, retry_after or 0.0)
+
+    def create(self, **kwargs):
+        # For streams this span ends once the response headers arrive; streaming.stream_chat
+        # times the rest of the generation
+        with tracing.span("llm.create", model=kwargs.get("model", ""), stream=bool(kwargs.get("stream"))) as create_span:
+            key = flight = None
+            if self.cache is not None and is_cacheable(kwargs):
+                key = cache_key(kwargs)
+                content = self.cache.get(key)
+                tracing.record_cache("llm", content is not None)
+                if content is not None:
+                    create_span.set(cache_hit=True)
+                    if kwargs.get("stream"):
+                        return iter([completion_chunk(content), completion_chunk(finish_reason="stop")])
+                    return completion_response(content)
+
+                with _in_flight_lock:
+                    flight = _in_flight.get(key)
+                    if flight is None:
+                        flight = _in_flight[key] = _InFlight()
+                    else:
+                        create_span.set(in_flight_hit=True)
+                        return self._follow(flight, kwargs)
+
+            try:
+                response = self._create_with_retries(**kwargs)
+            except Exception as error:
+                if flight is not None:
+                    self._land(key, flight, error)
+                raise
+            if not kwargs.get("stream"):
+                usage = getattr(response, "usage", None)
+                if usage is not None:
+                    create_span.set(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+                    tracing.record_tokens(usage.prompt_tokens, usage.completion_tokens, kwargs.get("model", ""))
+            if flight is None:
+                return response
+            if kwargs.get("stream"):
+                flight.pump(response, lambda done: self._land(key, done))
+                return flight.follow()
+            content = response.choices[0].message.content
+            if content is not None:
+                flight.add(completion_chunk(content, "stop"))
+            self._land(key, flight)
+            return response
+
+    def _land(self, key, flight, error=None):
+        # Only a reply that ran to completion is cached
+        if error is not None or not flight.done:
+            flight.finish(error)
+        content = flight.text()
+        if content is not None and flight.error is None:
+            self.cache.set(key, content)
+        with _in_flight_lock:
+            if _in_flight.get(key) is flight:
+                del _in_flight[key]
+
+    def _follow(self, flight, kwargs):
+        if kwargs.get("stream"):
+            return flight.follow(replay=True)
+        content = flight.wait()
+        if content is None:
+            # The first request ended without a full reply; send this one ourselves
+            return self._create_with_retries(**kwargs)
+        return completion_response(content)
+
+    def _create_with_retries(self, **kwargs):
+        estimated = estimate_tokens(kwargs.get("messages", []), kwargs.get("max_tokens"))
+        attempt = 0
+        while True:
+            with tracing.span("llm.rate_limit_wait", estimated_tokens=estimated):
+                try:
+                    waited = self.rate_limiter.acquire(estimated, self.max_wait)
+                except RateLimitWaitTooLong:
+                    with self._lock:
+                        self._stats["errors"] += 1
+                    raise
+            with self._lock:
+                self._stats["requests"] += 1
+                self._stats["rate_limit_wait_seconds"] += waited
+            try:
+                with tracing.span("llm.request", attempt=attempt):
+                    response, headers = self.backend.create(**kwargs)
+            except Exception as error:
+                if attempt >= self.max_retries or not self.backend.is_retryable(error):
+                    with self._lock:
+                        self._stats["errors"] += 1
+                    raise
+                headers = self.backend.error_headers(error)
+                self.rate_limiter.observe(headers)
+                delay = self._backoff(attempt, headers)
+                if self.max_wait is not None and delay > self.max_wait:
+                    # e.g. a spent daily quota: fail now rather than sleep for hours
+                    with self._lock:
+                        self._stats["errors"] += 1
+                    raise
+                self.rate_limiter.pause(delay)
+                with self._lock:
+                    self._stats["retries"] += 1
+                tracing.count("mi_llm_retries_total")
+                attempt += 1
+                continue
+            self.rate_limiter.observe(headers)
+            return response
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        if self.cache is not None:
+            stats["cache"] = self.cache.stats()
+        return stats
+
+    def close(self):
+        self.backend.close()
+
+
+def get_llm_client(api_key, timeout=DEFAULT_TIMEOUT_SECONDS, max_retries=DEFAULT_MAX_RETRIES, base_url=None,
+                   interactive=True):
+    """Return the process-wide client for ``api_key``, creating it on first use.
+
+    Interactive clients cap rate-limit and retry-after waits at MI_LLM_MAX_WAIT_SECONDS,
+    or ``timeout`` when that is not set. With ``interactive=False`` (batch jobs) calls
+    wait as long as the limits require.
+
+    Set ``MI_LLM_BACKEND=fake`` to run the apps fully offline against ``FakeBackend``.
+    """
+    backend_name = os.environ.get("MI_LLM_BACKEND", "groq")
+    digest = hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+    key = (digest, backend_name, timeout, max_retries, base_url, interactive)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is not None:
+            _clients.move_to_end(key)
+            return client
+        backend = FakeBackend() if backend_name == "fake" else GroqBackend(api_key, timeout=timeout, base_url=base_url)
+        max_wait = None
+        if interactive:
+            max_wait = float(DEFAULT_MAX_WAIT_SECONDS) if DEFAULT_MAX_WAIT_SECONDS else timeout
+        client = LLMClient(backend, max_retries=max_retries, cache=_response_cache, max_wait=max_wait)
+        _clients[key] = client
+        while len(_clients) > MAX_CACHED_CLIENTS:
+            # Not closed here: a session may still hold it, its pool goes with the last reference
+            _clients.popitem(last=False)
+    return client
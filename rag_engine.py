@@ -0,0 +1,544 @@
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+import tracing
+from chunking import DEFAULT_CHUNKING, Chunk, iter_chunks, tokenizer_length_fn
+from embedding_backends import EMBEDDING_DIMENSION, EmbeddingUnavailable, create_backend
+from embedding_cache import DEFAULT_CACHE_DIR, EmbeddingCache, corpus_cache_key, file_cache_key
+from lexical_index import BM25Index, reciprocal_rank_fusion
+from vector_index import DEFAULT_INDEX, apply_search_params, build_index, effective_config, normalize, supports_remove
+
+# --- Shared RAG engine for the MI feedback apps ---
+# Streamlit re-executes the app script top to bottom on every rerun, but imported
+# modules stay in sys.modules. Keeping the embedding model and the per-rubric-folder
+# engines here means they are built once per process and shared by every session.
+# app.py only imports this module once retrieval is needed (or from its warm-up
+# thread), so faiss and the embedding backend stay off the startup path.
+
+_embedding_model = None
+_embedding_model_lock = threading.Lock()
+
+# The lock only guards these dicts; builds run outside it, one Future per engine key
+_engines = {}
+_warm_ups = {}
+_watchers = {}
+_engines_lock = threading.Lock()
+
+# Per-category queries for feedback retrieval; embedded once when an engine is built
+MI_CATEGORY_QUERIES = {
+    "Evocation": "Evocation: open-ended questions that elicit change talk, self-efficacy, confidence and intrinsic motivation",
+    "Acceptance": "Acceptance: respect autonomy, ask permission, affirmations, reflections that show listening",
+    "Collaboration": "Collaboration: partnership and rapport, introduces self and role, elicits the patient's own ideas, does not lecture",
+    "Compassion": "Compassion: no judging, shaming or belittling, understands the patient's perceptions and challenges of change",
+    "Summary": "Summary: reflects the big picture, checks accuracy of information, agrees on next steps and follow up",
+}
+
+# Seconds between rubric folder polls; 0 leaves the index fixed until restart
+WATCH_INTERVAL = float(os.environ.get("MI_RAG_WATCH_SECONDS", "0"))
+
+# Fuse BM25 and vector rankings (reciprocal rank fusion); MI_RAG_HYBRID=0 is vector only
+HYBRID = os.environ.get("MI_RAG_HYBRID", "1") != "0"
+RRF_K = 60
+
+
+def get_embedding_model():
+    """Load the embedding backend (MI_EMBEDDING_BACKEND) once and reuse it for every engine."""
+    global _embedding_model
+    if _embedding_model is None:
+        with _embedding_model_lock:
+            if _embedding_model is None:
+                _embedding_model = create_backend()
+    return _embedding_model
+
+
+def mmr_select(query_vector, candidate_vectors, k, diversity=0.3):
+    """Maximal marginal relevance over unit vectors; returns candidate positions."""
+    if not len(candidate_vectors):
+        return []
+    relevance = candidate_vectors @ query_vector
+    pairwise = candidate_vectors @ candidate_vectors.T
+    selected, remaining = [], list(range(len(candidate_vectors)))
+    while remaining and len(selected) < k:
+        if selected:
+            redundancy = pairwise[np.ix_(remaining, selected)].max(axis=1)
+        else:
+            redundancy = np.zeros(len(remaining), dtype="float32")
+        scores = (1 - diversity) * relevance[remaining] - diversity * redundancy
+        selected.append(remaining.pop(int(np.argmax(scores))))
+    return selected
+
+
+def list_rubric_files(rubrics_dir):
+    return [
+        os.path.join(rubrics_dir, filename)
+        for filename in sorted(os.listdir(rubrics_dir))
+        if filename.endswith(".txt")
+    ]
+
+
+class RubricRAGEngine:
+    """Rubric folder -> chunks -> embeddings -> FAISS index, behind one object.
+
+    Every rubric file owns its own chunks and vector ids inside a ``faiss.IndexIDMap``,
+    so ``sync()`` only re-embeds and swaps the vectors of files that were added,
+    edited or deleted. The index type (exact, HNSW or IVF-PQ) comes from
+    ``index_config``; see vector_index.py. A BM25 index over the same chunks
+    (lexical_index.py) is fused with the vector ranking when ``hybrid`` is set.
+    Safe to share between concurrent Streamlit sessions: searches, index updates
+    and metric updates are serialised by a lock.
+    """
+
+    def __init__(self, rubrics_dir, embedding_model=None, chunking=DEFAULT_CHUNKING, cache=None,
+                 index_config=DEFAULT_INDEX, hybrid=HYBRID):
+        self.rubrics_dir = rubrics_dir
+        self.chunking = chunking
+        self.index_config = index_config
+        self.hybrid = hybrid
+        self.embedding_model = embedding_model or get_embedding_model()
+        self._length_fn = None
+        if chunking.unit == "tokens":
+            self._length_fn = tokenizer_length_fn(getattr(self.embedding_model, "tokenizer", None))
+        self.cache = cache
+        self.faiss_index = None
+        self.lexical_index = None
+
+        self._files = {}  # path -> {"key", "mtime", "size", "ids"}
+        self._chunks = {}  # vector id -> Chunk
+        self._vectors = {}  # vector id -> embedding row, for MMR re-ranking
+        self._next_id = 0
+
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._load_seconds = 0.0
+        self._query_count = 0
+        self._query_seconds_total = 0.0
+        self._query_seconds_last = 0.0
+        self._files_embedded = 0
+        self._files_from_cache = 0
+        self._index_from_cache = False
+        self._lexical_from_cache = False
+        self._syncs = 0
+        self._last_sync = {"added": 0, "updated": 0, "removed": 0, "seconds": 0.0}
+
+        self._load()
+        self._category_embeddings = normalize(self.encode_queries(list(MI_CATEGORY_QUERIES.values())))
+
+    @property
+    def knowledge_chunks(self):
+        with self._lock:
+            return [chunk.text for chunk in self._chunks.values()]
+
+    def _chunk_params(self):
+        return {"splitter": "iter_chunks", **self.chunking.as_dict()}
+
+    def _read_file(self, path):
+        with open(path, "rb") as f:
+            content = f.read()
+        return content, file_cache_key(content, self.embedding_model.name, self._chunk_params())
+
+    def _encode(self, texts):
+        with tracing.span("embedding.encode", model=self.embedding_model.name, texts=len(texts)):
+            return np.asarray(self.embedding_model.encode(texts), dtype="float32")
+
+    def encode_queries(self, queries):
+        """Embed fixed queries through the on-disk query cache, so a precomputed-only
+        backend can still use them."""
+        stored = self.cache.load_queries(self.embedding_model.name) if self.cache is not None else {}
+        missing = [query for query in queries if query not in stored]
+        if missing:
+            stored.update(zip(missing, self._encode(missing)))
+            if self.cache is not None:
+                self.cache.save_queries(self.embedding_model.name, stored)
+        return np.stack([stored[query] for query in queries]).astype("float32")
+
+    def _embed_file(self, path, key, content):
+        if self.cache is not None:
+            cached = self.cache.load_file(key)
+            tracing.record_cache("embedding", cached is not None)
+            if cached is not None:
+                self._files_from_cache += 1
+                return [Chunk(**chunk) for chunk in cached[0]], cached[1]
+
+        text = content.decode("utf-8", errors="ignore")
+        with tracing.span("chunking.split", source=os.path.basename(path), characters=len(text)) as split_span:
+            chunks = list(iter_chunks(text, os.path.basename(path), self.chunking, self._length_fn))
+            split_span.set(chunks=len(chunks))
+        if chunks:
+            embeddings = self._encode([chunk.text for chunk in chunks])
+        else:
+            embeddings = np.zeros((0, EMBEDDING_DIMENSION), dtype="float32")
+        self._files_embedded += 1
+        if self.cache is not None:
+            self.cache.save_file(key, [chunk.as_dict() for chunk in chunks], embeddings)
+        return chunks, embeddings
+
+    def _index_vectors(self, matrix):
+        # Inner-product indexes hold unit vectors, so their scores are cosine similarities
+        return normalize(matrix) if self.index_config.normalized else np.asarray(matrix, dtype="float32")
+
+    def vectors(self):
+        """All chunk embeddings as one matrix, in id order."""
+        with self._lock:
+            if not self._vectors:
+                return np.zeros((0, EMBEDDING_DIMENSION), dtype="float32")
+            return np.stack([self._vectors[i] for i in sorted(self._vectors)]).astype("float32")
+
+    def _rebuild_index(self):
+        ids = np.asarray(sorted(self._vectors), dtype="int64")
+        matrix = np.stack([self._vectors[i] for i in ids]) if len(ids) else np.zeros((0, EMBEDDING_DIMENSION))
+        return build_index(self.index_config, EMBEDDING_DIMENSION, self._index_vectors(matrix), ids)
+
+    def _rebuild_lexical_index(self):
+        return BM25Index.build((i, self._chunks[i].text) for i in sorted(self._chunks))
+
+    def _allocate_ids(self, count):
+        ids = np.arange(self._next_id, self._next_id + count, dtype="int64")
+        self._next_id += count
+        return ids
+
+    def _load(self):
+        with tracing.span("rubric.load", rubrics_dir=os.path.basename(self.rubrics_dir)) as load_span:
+            self._load_corpus()
+            load_span.set(files=len(self._files), chunks=len(self._chunks), files_from_cache=self._files_from_cache,
+                          index_from_cache=self._index_from_cache)
+
+    def _load_corpus(self):
+        start = time.perf_counter()
+
+        # Ids are handed out in file order, so the same files in the same order always
+        # map to the same ids; the corpus key covers names and order for that reason.
+        entries = {}
+        for path in list_rubric_files(self.rubrics_dir):
+            stat = os.stat(path)
+            content, key = self._read_file(path)
+            chunks, embeddings = self._embed_file(path, key, content)
+            ids = self._allocate_ids(len(chunks))
+            entries[path] = {"key": key, "mtime": stat.st_mtime_ns, "size": stat.st_size, "ids": ids.tolist()}
+            self._chunks.update(zip(ids.tolist(), chunks))
+            self._vectors.update(zip(ids.tolist(), embeddings))
+
+        # The index build parameters are part of the key: an HNSW graph or trained
+        # IVF-PQ centroids are only reusable for the same settings
+        layout = [(os.path.basename(path), entry["key"]) for path, entry in entries.items()]
+        corpus_key = corpus_cache_key(layout, self.index_config.cache_tag())
+        faiss_index = self.cache.load_index(corpus_key) if self.cache is not None else None
+        if faiss_index is not None and faiss_index.ntotal == len(self._chunks):
+            self._index_from_cache = True
+            apply_search_params(faiss_index, effective_config(self.index_config, faiss_index.ntotal))
+        else:
+            faiss_index = self._rebuild_index()
+            if self.cache is not None:
+                self.cache.save_index(corpus_key, faiss_index)
+
+        lexical_key = corpus_cache_key(layout, "bm25")
+        arrays = self.cache.load_lexical(lexical_key) if self.cache is not None else None
+        if arrays is not None and len(arrays["doc_ids"]) == len(self._chunks):
+            lexical_index = BM25Index.from_arrays(arrays)
+            self._lexical_from_cache = True
+        else:
+            lexical_index = self._rebuild_lexical_index()
+            if self.cache is not None:
+                self.cache.save_lexical(lexical_key, lexical_index.to_arrays())
+
+        self._files = entries
+        self.faiss_index = faiss_index
+        self.lexical_index = lexical_index
+        self._load_seconds = time.perf_counter() - start
+
+    def sync(self):
+        """Bring the index in line with the rubric folder, touching only changed files."""
+        with self._sync_lock:
+            start = time.perf_counter()
+            current = set(list_rubric_files(self.rubrics_dir))
+            removed = [path for path in self._files if path not in current]
+            changes = []  # (path, entry, chunks, embeddings)
+            added = 0
+
+            for path in sorted(current):
+                stat = os.stat(path)
+                entry = self._files.get(path)
+                if entry is not None and entry["mtime"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                    continue
+                content, key = self._read_file(path)
+                new_entry = {"key": key, "mtime": stat.st_mtime_ns, "size": stat.st_size, "ids": []}
+                if entry is not None and entry["key"] == key:
+                    # Touched but not edited: keep the existing vectors
+                    new_entry["ids"] = entry["ids"]
+                    self._files[path] = new_entry
+                    continue
+                # Embed outside the lock so searches keep running meanwhile
+                chunks, embeddings = self._embed_file(path, key, content)
+                changes.append((path, new_entry, chunks, embeddings))
+                added += entry is None
+
+            with self._lock:
+                stale_ids = [i for path in removed for i in self._files[path]["ids"]]
+                stale_ids += [i for path, _, _, _ in changes if path in self._files for i in self._files[path]["ids"]]
+                # HNSW cannot remove vectors, so edits and deletions rebuild it from _vectors
+                rebuild = bool(stale_ids) and not supports_remove(self.faiss_index)
+                if stale_ids:
+                    if not rebuild:
+                        self.faiss_index.remove_ids(np.asarray(stale_ids, dtype="int64"))
+                    for i in stale_ids:
+                        self._chunks.pop(i, None)
+                        self._vectors.pop(i, None)
+                for path in removed:
+                    del self._files[path]
+
+                for path, entry, chunks, embeddings in changes:
+                    ids = self._allocate_ids(len(chunks))
+                    if len(chunks) and not rebuild:
+                        self.faiss_index.add_with_ids(self._index_vectors(embeddings), ids)
+                    self._chunks.update(zip(ids.tolist(), chunks))
+                    self._vectors.update(zip(ids.tolist(), embeddings))
+                    entry["ids"] = ids.tolist()
+                    self._files[path] = entry
+                if rebuild:
+                    self.faiss_index = self._rebuild_index()
+                if stale_ids or changes:
+                    # Document frequencies shift with every change; a full BM25 build is a
+                    # single linear pass over the chunk texts
+                    self.lexical_index = self._rebuild_lexical_index()
+
+                self._syncs += 1
+                self._last_sync = {
+                    "added": added,
+                    "updated": len(changes) - added,
+                    "removed": len(removed),
+                    "seconds": time.perf_counter() - start,
+                }
+                return dict(self._last_sync)
+
+    def _record_query(self, start):
+        # Caller holds self._lock
+        elapsed = time.perf_counter() - start
+        self._query_count += 1
+        self._query_seconds_total += elapsed
+        self._query_seconds_last = elapsed
+
+    def vector_search(self, query, top_k=2):
+        """Return ``(Chunk, score)`` pairs, best first, with source metadata. The score
+        is an L2 distance for ``flat_l2`` and a cosine similarity for the other index types."""
+        start = time.perf_counter()
+        query_embedding = self._index_vectors(self._encode([query]))
+        with self._lock, tracing.span("faiss.search", k=top_k):
+            distances, ids = self.faiss_index.search(query_embedding, top_k)
+            results = [(self._chunks[i], float(d)) for i, d in zip(ids[0], distances[0]) if i >= 0]
+            self._record_query(start)
+        return results
+
+    def lexical_search(self, query, top_k=2):
+        """Return ``(Chunk, BM25 score)`` pairs, best first."""
+        start = time.perf_counter()
+        with self._lock, tracing.span("bm25.search", k=top_k):
+            results = [(self._chunks[i], score) for i, score in self.lexical_index.search(query, top_k)]
+            self._record_query(start)
+        return results
+
+    def search(self, query, top_k=2, fetch_k=20):
+        """Hybrid search: BM25 and vector rankings of ``fetch_k`` candidates each, fused
+        with reciprocal rank fusion. Returns ``(Chunk, fused score)`` pairs, best first.
+        Without ``hybrid`` this is ``vector_search``."""
+        if not self.hybrid:
+            return self.vector_search(query, top_k)
+        start = time.perf_counter()
+        try:
+            query_embedding = self._index_vectors(self._encode([query]))
+        except EmbeddingUnavailable:
+            # Precomputed-only backend: the lexical ranking still works
+            query_embedding = None
+        with self._lock:
+            with tracing.span("bm25.search", k=fetch_k):
+                rankings = [[i for i, _ in self.lexical_index.search(query, fetch_k)]]
+            if query_embedding is not None:
+                with tracing.span("faiss.search", k=fetch_k):
+                    _, ids = self.faiss_index.search(query_embedding, min(fetch_k, max(self.faiss_index.ntotal, 1)))
+                rankings.append([int(i) for i in ids[0] if i >= 0])
+            fused = reciprocal_rank_fusion(rankings, RRF_K)[:top_k]
+            results = [(self._chunks[i], score) for i, score in fused]
+            self._record_query(start)
+        return results
+
+    def retrieve(self, query, top_k=2):
+        return [chunk.text for chunk, _ in self.search(query, top_k)]
+
+    def embed_turn(self, text):
+        """Unit vector of one student turn for ``retrieve_for_feedback``, or None if the
+        backend cannot embed new text."""
+        try:
+            return normalize(self._encode([text]))[0]
+        except EmbeddingUnavailable:
+            return None
+
+    def retrieve_for_feedback(self, student_turns, per_category=1, fetch_k=8, diversity=0.3, turn_vectors=None):
+        """Rubric chunks per MI category, grounded in what the student actually said.
+
+        ``turn_vectors`` may hold a vector from ``embed_turn`` (or None) per student turn;
+        the turns without one are embedded here, in one ``encode`` call. For every category the
+        turns most similar to that category are blended into its precomputed query
+        vector, candidates are re-ranked with MMR and chunks already picked for an
+        earlier category are skipped. With ``hybrid`` the candidate pool is the RRF
+        fusion of the vector ranking and a BM25 ranking of the category query, so
+        chunks using the rubric's exact terms are not missed.
+        Returns ``{category: [chunk text, ...]}``.
+        """
+        start = time.perf_counter()
+        categories = list(MI_CATEGORY_QUERIES)
+        queries = self._category_embeddings
+        if turn_vectors is None:
+            turn_vectors = [None] * len(student_turns)
+        pairs = [(turn, vector) for turn, vector in zip(student_turns, turn_vectors) if turn.strip()]
+        missing = [turn for turn, vector in pairs if vector is None]
+        try:
+            encoded = iter(normalize(self._encode(missing))) if missing else iter(())
+            vectors = [next(encoded) if vector is None else vector for _, vector in pairs]
+            turn_vectors = np.stack(vectors).astype("float32") if vectors else None
+        except EmbeddingUnavailable:
+            # Precomputed-only backend: fall back to the cached category queries alone
+            turn_vectors = None
+        if turn_vectors is not None:
+            affinity = queries @ turn_vectors.T  # categories x turns
+            weights = np.exp((affinity - affinity.max(axis=1, keepdims=True)) / 0.1)
+            weights /= weights.sum(axis=1, keepdims=True)
+            queries = normalize(queries + weights @ turn_vectors)
+
+        results = {}
+        with self._lock:
+            fetch_k = min(fetch_k, self.faiss_index.ntotal)
+            if fetch_k:
+                with tracing.span("faiss.search", k=fetch_k, queries=len(queries)):
+                    _, candidate_ids = self.faiss_index.search(np.ascontiguousarray(queries, dtype="float32"), fetch_k)
+            seen_ids, seen_texts = set(), set()
+            for row, category in enumerate(categories):
+                results[category] = []
+                if not fetch_k:
+                    continue
+                ids = [int(i) for i in candidate_ids[row] if i >= 0]
+                if self.hybrid:
+                    with tracing.span("bm25.search", k=fetch_k, category=category):
+                        lexical = [i for i, _ in self.lexical_index.search(MI_CATEGORY_QUERIES[category], fetch_k)]
+                    ids = [i for i, _ in reciprocal_rank_fusion([ids, lexical], RRF_K)[:fetch_k]]
+                ids = [i for i in ids if i not in seen_ids]
+                ids = [i for i in ids if self._chunks[i].text not in seen_texts]
+                if not ids:
+                    continue
+                vectors = normalize(np.stack([self._vectors[i] for i in ids]))
+                for position in mmr_select(queries[row], vectors, per_category, diversity):
+                    chunk_id = ids[position]
+                    seen_ids.add(chunk_id)
+                    seen_texts.add(self._chunks[chunk_id].text)
+                    results[category].append(self._chunks[chunk_id].text)
+            self._record_query(start)
+        return results
+
+    def stats(self):
+        with self._lock:
+            avg = self._query_seconds_total / self._query_count if self._query_count else 0.0
+            return {
+                "rubrics_dir": self.rubrics_dir,
+                "chunking": self.chunking.as_dict(),
+                "index": effective_config(self.index_config, len(self._chunks)).as_dict(),
+                "files": len(self._files),
+                "chunks": len(self._chunks),
+                "load_seconds": self._load_seconds,
+                "files_embedded": self._files_embedded,
+                "files_from_cache": self._files_from_cache,
+                "index_from_cache": self._index_from_cache,
+                "hybrid": self.hybrid,
+                "lexical": self.lexical_index.stats(),
+                "lexical_from_cache": self._lexical_from_cache,
+                "syncs": self._syncs,
+                "last_sync": dict(self._last_sync),
+                "queries": self._query_count,
+                "query_seconds_total": self._query_seconds_total,
+                "query_seconds_avg": avg,
+                "query_seconds_last": self._query_seconds_last,
+            }
+
+
+class RubricWatcher:
+    """Poll a rubric folder and call ``engine.sync()`` so new transcripts show up live."""
+
+    def __init__(self, engine, interval=5.0):
+        self.engine = engine
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="rubric-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.engine.sync()
+            except (OSError, EmbeddingUnavailable):
+                # A file vanished mid-scan, or new files cannot be embedded in
+                # precomputed mode; the next poll tries again
+                continue
+
+
+def get_engine(rubrics_dir, chunking=DEFAULT_CHUNKING, cache_dir=DEFAULT_CACHE_DIR, watch_interval=WATCH_INTERVAL,
+               index_config=DEFAULT_INDEX):
+    """Return the process-wide engine for a rubric folder, building it on first use.
+
+    Chunks, embeddings and the FAISS index are persisted under ``cache_dir``
+    (pass ``None`` to disable), so cold starts only re-embed changed files.
+    With a positive ``watch_interval`` a background watcher keeps the index in
+    sync with the folder. ``index_config`` picks the vector index type
+    (default from MI_RAG_INDEX).
+    """
+    key = (os.path.abspath(rubrics_dir), chunking, index_config)
+    with _engines_lock:
+        future = _engines.get(key)
+        building = future is None
+        if building:
+            future = _engines[key] = Future()
+    if not building:
+        # Another thread (e.g. the warm-up) is building it, or already has
+        return future.result()
+
+    try:
+        cache = EmbeddingCache(cache_dir) if cache_dir else None
+        engine = RubricRAGEngine(key[0], chunking=chunking, cache=cache, index_config=index_config)
+    except BaseException as error:
+        # Let the next caller try again instead of caching the failure
+        with _engines_lock:
+            del _engines[key]
+        future.set_exception(error)
+        raise
+    if watch_interval and watch_interval > 0:
+        with _engines_lock:
+            _watchers[key] = RubricWatcher(engine, watch_interval).start()
+    future.set_result(engine)
+    return engine
+
+
+def start_warm_up(rubrics_dir, **engine_kwargs):
+    """Build the engine for ``rubrics_dir`` in a background thread (once per process).
+
+    Never waits for a build, so it is safe to call on every rerun.
+    """
+    key = os.path.abspath(rubrics_dir)
+    with _engines_lock:
+        thread = _warm_ups.get(key)
+        if thread is None:
+            thread = threading.Thread(
+                target=get_engine, args=(key,), kwargs=engine_kwargs, name="rag-warm-up", daemon=True
+            )
+            _warm_ups[key] = thread
+            thread.start()
+    return thread
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# --- Content-addressed LLM response cache ---
+# Keyed by model, messages and sampling parameters. Only reproducible requests are
+# cached (temperature 0 or a fixed seed), e.g. regenerating feedback for an unchanged
+# transcript or a double-submitted "Finish Session" press. An in-memory LRU sits in
+# front of an optional SQLite tier whose entries expire after ``ttl_seconds``.
+
+DEFAULT_DB_PATH = os.environ.get("MI_LLM_CACHE_DB") or None
+DEFAULT_TTL_SECONDS = float(os.environ.get("MI_LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Request fields that do not change the generated text
+_IGNORED_PARAMS = {"stream", "timeout", "extra_headers", "extra_query", "extra_body"}
+
+
+def is_cacheable(request):
+    if request.get("n", 1) != 1:
+        return False
+    return request.get("temperature") == 0 or request.get("seed") is not None
+
+
+def cache_key(request):
+    payload = {key: value for key, value in request.items() if key not in _IGNORED_PARAMS}
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, max_entries=256, db_path=DEFAULT_DB_PATH, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()  # key -> (stored_at, content)
+        self._lock = threading.Lock()
+        self._hits = {"memory": 0, "disk": 0}
+        self._misses = 0
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, stored_at REAL, content TEXT)"
+            )
+            self._db.commit()
+
+    def _expired(self, stored_at):
+        return self.ttl_seconds and time.time() - stored_at > self.ttl_seconds
+
+    def get(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and not self._expired(entry[0]):
+                self._memory.move_to_end(key)
+                self._hits["memory"] += 1
+                return entry[1]
+            if entry is not None:
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute("SELECT stored_at, content FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None and not self._expired(row[0]):
+                    self._remember(key, row[0], row[1])
+                    self._hits["disk"] += 1
+                    return row[1]
+                if row is not None:
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self._misses += 1
+            return None
+
+    def _remember(self, key, stored_at, content):
+        self._memory[key] = (stored_at, content)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def set(self, key, content):
+        stored_at = time.time()
+        with self._lock:
+            self._remember(key, stored_at, content)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, stored_at, content) VALUES (?, ?, ?)",
+                    (key, stored_at, content),
+                )
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            hits = self._hits["memory"] + self._hits["disk"]
+            lookups = hits + self._misses
+            return {
+                "hits": hits,
+                "memory_hits": self._hits["memory"],
+                "disk_hits": self._hits["disk"],
+                "misses": self._misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "entries": len(self._memory),
+            }
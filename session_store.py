@@ -0,0 +1,244 @@
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+
+# --- Durable session transcripts ---
+# Every practice session is kept in SQLite as an append-only log of events: the chat
+# messages (with their stream timings) and every generated feedback report. The chat
+# path never waits on the disk: appends go onto a queue that a background thread
+# flushes in batches, one transaction per batch.
+#
+#   MI_SESSION_DB=sessions.sqlite    where sessions are stored ("" turns the store off)
+#   python session_store.py export sessions.jsonl [--scenario ohi]
+#
+# An exported line is {"id", "scenario", "chat_history", "feedback", ...}, which
+# batch_grade.py accepts as input.
+
+DEFAULT_DB_PATH = os.environ.get(
+    "MI_SESSION_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "sessions.sqlite"),
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    scenario TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    metadata TEXT
+);
+CREATE TABLE IF NOT EXISTS events (
+    event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL REFERENCES sessions(session_id),
+    kind TEXT NOT NULL,
+    role TEXT,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    timings TEXT
+);
+CREATE INDEX IF NOT EXISTS events_by_session ON events (session_id, event_id);
+"""
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def owner_hash(api_key):
+    """What a session records about who started it: a hash of their API key, never the key."""
+    return hashlib.sha256(f"mi-session-owner:{api_key}".encode("utf-8")).hexdigest()
+
+
+class SessionStore:
+    """SQLite session log with queued, batched writes from one writer thread."""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, batch_size=64, flush_interval=0.5):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._stats = {"queued": 0, "written": 0, "batches": 0, "errors": 0}
+        self._stats_lock = threading.Lock()
+
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+        self._read_db = self._connect()
+        self._read_lock = threading.Lock()
+        self._writer = threading.Thread(target=self._run, name="session-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        # WAL lets readers (resume, export) run while the writer commits
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    # --- Writes (queued) ---
+    def _enqueue(self, statement, params):
+        with self._stats_lock:
+            self._stats["queued"] += 1
+        self._queue.put((statement, params))
+
+    def start_session(self, scenario, session_id=None, metadata=None):
+        session_id = session_id or uuid.uuid4().hex
+        self._enqueue(
+            "INSERT OR IGNORE INTO sessions (session_id, scenario, created_at, metadata) VALUES (?, ?, ?, ?)",
+            (session_id, scenario, time.time(), json.dumps(metadata) if metadata else None),
+        )
+        return session_id
+
+    def append_message(self, session_id, role, content, timings=None):
+        self._append(session_id, "message", role, content, timings)
+
+    def append_feedback(self, session_id, content, timings=None):
+        self._append(session_id, "feedback", None, content, timings)
+
+    def _append(self, session_id, kind, role, content, timings):
+        self._enqueue(
+            "INSERT INTO events (session_id, kind, role, content, created_at, timings) VALUES (?, ?, ?, ?, ?, ?)",
+            (session_id, kind, role, content, time.time(), json.dumps(timings) if timings else None),
+        )
+
+    def _run(self):
+        db = self._connect()
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(db, batch)
+
+    def _write(self, db, batch):
+        writes = [item for item in batch if item is not None]  # None is a flush marker
+        try:
+            with db:
+                for statement, params in writes:
+                    db.execute(statement, params)
+            with self._stats_lock:
+                self._stats["written"] += len(writes)
+                self._stats["batches"] += 1
+        except sqlite3.Error as error:
+            with self._stats_lock:
+                self._stats["errors"] += 1
+            print(f"session store: dropped a batch of {len(writes)} writes: {error}", file=sys.stderr)
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def flush(self):
+        """Block until every write queued so far is committed."""
+        self._queue.put(None)
+        self._queue.join()
+
+    # --- Reads ---
+    def _events(self, session_id):
+        return self._read_db.execute(
+            "SELECT kind, role, content, created_at, timings FROM events WHERE session_id = ? ORDER BY event_id",
+            (session_id,),
+        ).fetchall()
+
+    def _session_record(self, row):
+        session_id, scenario, created_at, metadata = row
+        record = {
+            "id": session_id,
+            "scenario": scenario,
+            "created_at": created_at,
+            "metadata": json.loads(metadata) if metadata else None,
+            "chat_history": [],
+            "feedback": [],
+            "latency_log": [],
+        }
+        for kind, role, content, event_at, timings in self._events(session_id):
+            if kind == "message":
+                record["chat_history"].append({"role": role, "content": content})
+            else:
+                record["feedback"].append({"content": content, "created_at": event_at})
+            if timings:
+                record["latency_log"].append(json.loads(timings))
+        return record
+
+    def load_session(self, session_id, owner=None):
+        """The stored session as ``{"id", "scenario", "chat_history", "feedback", ...}``, or None.
+
+        With ``owner`` (an ``owner_hash``) sessions started by someone else count as missing.
+        """
+        self.flush()
+        with self._read_lock:
+            row = self._read_db.execute(
+                "SELECT session_id, scenario, created_at, metadata FROM sessions WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            if owner is not None and (json.loads(row[3]) if row[3] else {}).get("owner") != owner:
+                return None
+            return self._session_record(row)
+
+    def iter_sessions(self, scenario=None):
+        self.flush()
+        query = "SELECT session_id, scenario, created_at, metadata FROM sessions"
+        params = ()
+        if scenario:
+            query += " WHERE scenario = ?"
+            params = (scenario,)
+        with self._read_lock:
+            rows = self._read_db.execute(query + " ORDER BY created_at", params).fetchall()
+        for row in rows:
+            with self._read_lock:
+                record = self._session_record(row)
+            yield record
+
+    def export_jsonl(self, output_path, scenario=None):
+        exported = 0
+        with open(output_path, "w", encoding="utf-8") as f:
+            for record in self.iter_sessions(scenario):
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                exported += 1
+        return exported
+
+    def stats(self):
+        with self._stats_lock:
+            return {**self._stats, "pending": self._queue.unfinished_tasks}
+
+
+def get_session_store(db_path=DEFAULT_DB_PATH):
+    """The process-wide store, or None when ``MI_SESSION_DB`` is set to ""."""
+    global _store
+    if not db_path:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = SessionStore(db_path)
+            # Daemon writer: commit whatever is still queued when the process exits
+            atexit.register(_store.flush)
+    return _store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export stored MI practice sessions.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="write every session as one JSON line")
+    export.add_argument("output")
+    export.add_argument("--scenario", default=None)
+    export.add_argument("--db", default=DEFAULT_DB_PATH)
+    args = parser.parse_args()
+
+    store = SessionStore(args.db)
+    print(f"exported {store.export_jsonl(args.output, args.scenario)} sessions to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import time
+from dataclasses import asdict, dataclass, field
+
+import tracing
+
+# --- Streaming chat completions ---
+# Patient replies and feedback reports are rendered token by token (st.write_stream)
+# instead of after the whole completion. Each request records its time to first
+# token separately from the total generation time; the "llm.stream" span carries the
+# same numbers to the tracing /traces endpoint.
+
+
+@dataclass
+class StreamTimings:
+    kind: str = "chat"
+    model: str = ""
+    started_at: float = field(default_factory=time.time)
+    ttft_seconds: float = None
+    total_seconds: float = None
+    chunks: int = 0
+    characters: int = 0
+
+    def as_dict(self):
+        return asdict(self)
+
+
+def stream_chat(client, timings=None, **kwargs):
+    """Yield the content deltas of a streamed ``client.chat.completions.create`` call.
+
+    ``timings`` (a ``StreamTimings``) is filled in as the stream progresses.
+    """
+    if timings is None:
+        timings = StreamTimings()
+    timings.model = kwargs.get("model", timings.model)
+    start = time.perf_counter()
+
+    stream_span = tracing.start_span("llm.stream", kind=timings.kind, model=timings.model)
+    try:
+        stream = client.chat.completions.create(stream=True, **kwargs)
+        for chunk in stream:
+            usage = getattr(getattr(chunk, "x_groq", None), "usage", None)
+            if usage is not None:
+                stream_span.set(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+                tracing.record_tokens(usage.prompt_tokens, usage.completion_tokens, timings.model)
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            if timings.ttft_seconds is None:
+                timings.ttft_seconds = time.perf_counter() - start
+            timings.chunks += 1
+            timings.characters += len(delta)
+            yield delta
+    finally:
+        timings.total_seconds = time.perf_counter() - start
+        stream_span.set(ttft_seconds=timings.ttft_seconds, total_seconds=timings.total_seconds,
+                        chunks=timings.chunks)
+        stream_span.end()
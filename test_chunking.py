@@ -0,0 +1,57 @@
+import random
+
+from chunking import ChunkingConfig, approximate_token_length, iter_chunks
+
+# Chunk lengths never exceed max_length, whatever the speaker structure looks like.
+
+SPEAKERS = ["Provider:", "Patient:", "STUDENT:", "PATIENT (Alex):"]
+
+
+def random_transcript(rng, turns=60):
+    # Short and long turns, with words of one to five word pieces
+    lines = []
+    for _ in range(turns):
+        words = [rng.choice(["brush", "floss", "twice", "night's", "don't!", "(really?)", "gums,", "ok", "a-b-c"])
+                 for _ in range(rng.randint(1, rng.choice([3, 20, 150])))]
+        lines.append(f"{rng.choice(SPEAKERS)} {' '.join(words)}")
+    if rng.random() < 0.5:
+        lines.insert(rng.randint(0, len(lines)), "Acceptance: Respect Autonomy, Affirmation")
+    return "\n".join(lines)
+
+
+def chunk_length(chunk, config):
+    if config.unit == "chars":
+        return len(chunk.text)
+    return sum(approximate_token_length(word) for word in chunk.text.split())
+
+
+def test_chunks_never_exceed_max_length():
+    rng = random.Random(0)
+    configs = [
+        ChunkingConfig(max_length=128, unit="tokens", overlap=16, structure=True),
+        ChunkingConfig(max_length=32, unit="tokens", overlap=8, structure=True),
+        ChunkingConfig(max_length=200, unit="chars", overlap=40, structure=True),
+        ChunkingConfig(max_length=200, unit="chars", overlap=0, structure=False),
+    ]
+    for _ in range(60):
+        text = random_transcript(rng)
+        for config in configs:
+            for chunk in iter_chunks(text, config=config):
+                assert chunk_length(chunk, config) <= config.max_length
+
+
+def test_unfinished_turn_near_max_length_is_cut_again():
+    # When "don't!" (4 pieces) overflows, cutting at "Provider:" only frees the 3
+    # pieces of "Patient: a"; the unfinished turn must then be cut again
+    config = ChunkingConfig(max_length=20, unit="tokens", overlap=0, structure=True)
+    text = "Patient: a\nProvider: " + "ok " * 15 + "don't!"
+    chunks = list(iter_chunks(text, config=config))
+    assert [chunk.text for chunk in chunks] == ["Patient: a", "Provider: " + "ok " * 14 + "ok", "don't!"]
+
+
+def test_offsets_point_into_the_source():
+    config = ChunkingConfig(max_length=16, unit="tokens", overlap=0, structure=True)
+    text = "Provider: what brings you in today?\nPatient: my gums bleed when I brush at night."
+    for chunk in iter_chunks(text, source="t.txt", config=config):
+        assert chunk.source == "t.txt"
+        assert text[chunk.start:chunk.end].split() == chunk.text.split()
@@ -0,0 +1,60 @@
+from conversation_context import ConversationContext, message_tokens
+
+# Eviction planning and the rolling summary, with a stand-in summarizer (no LLM).
+
+PREFIX = [{"role": "system", "content": "You are Alex, a patient. " * 40}]
+STUDENT = "What would make it a bit easier to brush at night, given your evenings? " * 2
+REPLY = "Honestly, some nights I just crash before bed and skip it. " * 6
+
+
+def fake_summarizer(summary, turns):
+    return " ".join(["patient", "habits"] * 40)
+
+
+def history(exchanges):
+    messages = [{"role": "assistant", "content": "Hello! I'm Alex."}]
+    for _ in range(exchanges):
+        messages.append({"role": "user", "content": STUDENT})
+        messages.append({"role": "assistant", "content": REPLY})
+    return messages
+
+
+def tokens(messages):
+    return sum(message_tokens(message) for message in messages)
+
+
+def test_no_eviction_under_budget():
+    context = ConversationContext(fake_summarizer, budget_tokens=10_000)
+    assert context.plan_eviction(PREFIX, history(3), ConversationContext.new_state()) is None
+
+
+def test_eviction_keeps_recent_messages_and_reaches_target():
+    context = ConversationContext(fake_summarizer, budget_tokens=1200, keep_recent=4)
+    chat_history = history(12)
+    upto = context.plan_eviction(PREFIX, chat_history, ConversationContext.new_state())
+    assert upto is not None
+    assert upto <= len(chat_history) - 4
+    incoming = message_tokens({"role": "user", "content": STUDENT})
+    assert tokens(PREFIX) + tokens(chat_history[upto:]) + incoming <= context.target_tokens
+
+
+def test_incoming_student_turn_counts_towards_the_budget():
+    chat_history = history(4)
+    incoming = message_tokens({"role": "user", "content": STUDENT})
+    # The history alone fits, the history plus the next student message does not
+    budget = tokens(PREFIX) + tokens(chat_history) + incoming - 1
+    context = ConversationContext(fake_summarizer, budget_tokens=budget, keep_recent=2)
+    assert context.plan_eviction(PREFIX, chat_history, ConversationContext.new_state()) is not None
+
+
+def test_prompts_stay_under_budget_once_summaries_finish():
+    context = ConversationContext(fake_summarizer, budget_tokens=1500)
+    state = ConversationContext.new_state()
+    chat_history = history(0)
+    for _ in range(30):
+        chat_history.append({"role": "user", "content": STUDENT})
+        assert context.prompt_tokens(context.build(PREFIX, chat_history, state)) <= context.budget_tokens
+        chat_history.append({"role": "assistant", "content": REPLY})
+        context.update(PREFIX, chat_history, state, wait=True)
+    assert state["summary"]
+    assert state["summarized_upto"] > 0
@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pytest
+
+from llm_client import FakeAPIError, FakeBackend, LLMClient, RateLimiter, RateLimitWaitTooLong
+from response_cache import ResponseCache, cache_key
+
+# Offline tests for LLMClient against FakeBackend: retries, rate-limit waits and the
+# in-flight de-duplication of identical cacheable requests.
+
+REPLY = "one two three four five six seven eight"
+
+
+def make_client(backend, **kwargs):
+    kwargs.setdefault("rate_limiter", RateLimiter(requests_per_minute=6000, tokens_per_minute=10_000_000))
+    kwargs.setdefault("backoff_base", 0.001)
+    kwargs.setdefault("backoff_cap", 0.001)
+    return LLMClient(backend, cache=ResponseCache(db_path=None), **kwargs)
+
+
+def request(content, stream=True):
+    return {"model": "test", "temperature": 0, "stream": stream, "messages": [{"role": "user", "content": content}]}
+
+
+def read(stream):
+    return "".join(chunk.choices[0].delta.content or "" for chunk in stream if chunk.choices)
+
+
+def test_retries_429s_until_success():
+    backend = FakeBackend(reply=REPLY, rate_limit_first=2)
+    client = make_client(backend, max_retries=3)
+    response = client.create(**request("retry then succeed", stream=False))
+    assert response.choices[0].message.content == REPLY
+    assert len(backend.calls) == 3
+    assert client.stats()["retries"] == 2
+
+
+def test_gives_up_after_max_retries():
+    backend = FakeBackend(reply=REPLY, rate_limit_first=10)
+    client = make_client(backend, max_retries=2)
+    with pytest.raises(FakeAPIError):
+        client.create(**request("always rate limited", stream=False))
+    assert len(backend.calls) == 3
+    stats = client.stats()
+    assert stats["retries"] == 2
+    assert stats["errors"] == 1
+
+
+def test_retry_after_longer_than_max_wait_raises_at_once():
+    backend = FakeBackend(reply=REPLY, rate_limit_first=1, retry_after=3600)
+    client = make_client(backend, max_wait=1.0)
+    start = time.perf_counter()
+    with pytest.raises(FakeAPIError):
+        client.create(**request("daily quota spent", stream=False))
+    assert time.perf_counter() - start < 0.5
+    assert len(backend.calls) == 1
+
+
+def test_rate_limit_reset_longer_than_max_wait_raises():
+    limiter = RateLimiter(requests_per_minute=6000, tokens_per_minute=10_000_000)
+    limiter.observe({"x-ratelimit-remaining-tokens": "0", "x-ratelimit-reset-tokens": "2h"})
+    backend = FakeBackend(reply=REPLY)
+    client = make_client(backend, rate_limiter=limiter, max_wait=1.0)
+    with pytest.raises(RateLimitWaitTooLong):
+        client.create(**request("bucket blocked", stream=False))
+    assert backend.calls == []
+
+
+def test_concurrent_identical_streams_share_one_backend_call():
+    backend = FakeBackend(reply=REPLY, tokens_per_second=100)
+    client = make_client(backend)
+    callers = 8
+    start = threading.Barrier(callers)
+    texts = []
+
+    def caller():
+        start.wait()
+        texts.append(read(client.create(**request("same transcript"))))
+
+    threads = [threading.Thread(target=caller) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert texts == [REPLY] * callers
+    assert len(backend.calls) == 1
+
+
+def test_interrupted_stream_still_lands_in_cache():
+    backend = FakeBackend(reply=REPLY, tokens_per_second=100)
+    client = make_client(backend)
+    stream = client.create(**request("double click"))
+    next(stream)
+    stream.close()  # a Streamlit rerun abandons the first stream
+
+    key = cache_key(request("double click"))
+    deadline = time.monotonic() + 5
+    while client.cache.get(key) is None and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert client.cache.get(key) == REPLY
+    assert read(client.create(**request("double click"))) == REPLY
+    assert len(backend.calls) == 1
@@ -0,0 +1,324 @@
+import contextvars
+import cProfile
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- Request tracing and metrics ---
+# Spans wrap the stages of a request (Streamlit rerun, chat turn, rubric load, chunking,
+# embedding, FAISS / BM25 search, LLM calls). A span opened while no other span is
+# active starts a new trace; nested spans become its children. Finished traces go to
+# RECENT_TRACES, to an optional JSONL sink, and into Prometheus-style metrics.
+#
+#   MI_TRACING=0                      turn tracing off (spans become no-ops)
+#   MI_TRACE_JSONL=traces.jsonl       append every finished trace as one JSON line
+#   MI_METRICS_PORT=9464              serve /metrics (Prometheus text) and /traces
+#   MI_TRACE_PROFILE_SECONDS=2        cProfile traces and keep the profile of any
+#                                     trace slower than this (MI_TRACE_PROFILE_DIR)
+
+ENABLED = os.environ.get("MI_TRACING", "1") != "0"
+JSONL_PATH = os.environ.get("MI_TRACE_JSONL")
+PROFILE_THRESHOLD_SECONDS = float(os.environ.get("MI_TRACE_PROFILE_SECONDS", "0"))
+PROFILE_DIR = os.environ.get(
+    "MI_TRACE_PROFILE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".profiles"),
+)
+
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Finished traces across all sessions in this process, newest last
+RECENT_TRACES = deque(maxlen=200)
+
+_current_span = contextvars.ContextVar("mi_current_span", default=None)
+_ids = itertools.count(1)
+_sink_lock = threading.Lock()
+_metrics_server = None
+_metrics_server_lock = threading.Lock()
+
+
+# --- Metrics ---
+
+class Metrics:
+    """Counters and duration histograms, rendered in the Prometheus text format."""
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self._counters = {}  # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def count(self, name, amount=1, help=None, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+            if help:
+                self._help.setdefault(name, help)
+
+    def observe(self, name, value, help=None, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(self.buckets) + 2)
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram[position] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+            if help:
+                self._help.setdefault(name, help)
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ""
+        escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+        return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+    def prometheus_text(self):
+        lines, described = [], set()
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, list(values)) for key, values in self._histograms.items())
+            help_texts = dict(self._help)
+
+        def describe(name, kind):
+            if name not in described:
+                described.add(name)
+                if name in help_texts:
+                    lines.append(f"# HELP {name} {help_texts[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            describe(name, "counter")
+            lines.append(f"{name}{self._labels(labels)} {value}")
+        for (name, labels), values in histograms:
+            describe(name, "histogram")
+            for bound, bucket_count in zip(self.buckets, values):
+                lines.append(f"{name}_bucket{self._labels(labels, [('le', bound)])} {bucket_count}")
+            lines.append(f"{name}_bucket{self._labels(labels, [('le', '+Inf')])} {values[-1]}")
+            lines.append(f"{name}_sum{self._labels(labels)} {values[-2]}")
+            lines.append(f"{name}_count{self._labels(labels)} {values[-1]}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+
+
+def count(name, amount=1, **labels):
+    if ENABLED:
+        METRICS.count(name, amount, **labels)
+
+
+def record_cache(cache, hit):
+    """Count a lookup in one of the app's caches (LLM responses, embeddings, ...)."""
+    count("mi_cache_requests_total", cache=cache, result="hit" if hit else "miss")
+    current = _current_span.get()
+    if current is not None:
+        current.add(f"{cache}_cache_{'hits' if hit else 'misses'}")
+
+
+def record_tokens(prompt_tokens=None, completion_tokens=None, model=""):
+    for kind, amount in (("prompt", prompt_tokens), ("completion", completion_tokens)):
+        if amount:
+            count("mi_llm_tokens_total", amount, type=kind, model=model)
+
+
+# --- Spans ---
+
+class Span:
+    def __init__(self, name, trace, parent_id, attributes):
+        self.name = name
+        self.trace = trace
+        self.span_id = next(_ids)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.start = time.perf_counter()
+        self.duration = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+        return self
+
+    def add(self, name, amount=1):
+        self.attributes[name] = self.attributes.get(name, 0) + amount
+        return self
+
+    def end(self):
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self.start
+        METRICS.observe("mi_span_duration_seconds", self.duration, help="Duration of traced stages", span=self.name)
+        self.trace.finish_span(self)
+
+
+class _NoopSpan:
+    def set(self, **attributes):
+        return self
+
+    def add(self, name, amount=1):
+        return self
+
+    def end(self):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    def __init__(self, name):
+        self.trace_id = f"{os.getpid():x}-{next(_ids):x}"
+        self.name = name
+        self.started_at = time.time()
+        self.spans = []
+        self.root = None
+        self.profiler = None
+        if PROFILE_THRESHOLD_SECONDS > 0:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+                self.profiler = profiler
+            except ValueError:
+                pass  # another profiler is already active in this process
+
+    def finish_span(self, span):
+        self.spans.append(span)
+        if span is self.root:
+            self.finish()
+
+    def finish(self):
+        profile_path = None
+        if self.profiler is not None:
+            self.profiler.disable()
+            if self.root.duration >= PROFILE_THRESHOLD_SECONDS:
+                try:
+                    os.makedirs(PROFILE_DIR, exist_ok=True)
+                    profile_path = os.path.join(PROFILE_DIR, f"{self.name}-{self.trace_id}.prof")
+                    self.profiler.dump_stats(profile_path)
+                    count("mi_slow_traces_profiled_total", trace=self.name)
+                except OSError:
+                    profile_path = None
+            self.profiler = None
+
+        record = self.as_dict()
+        if profile_path:
+            record["profile"] = profile_path
+        RECENT_TRACES.append(record)
+        if JSONL_PATH:
+            line = json.dumps(record, default=str) + "\n"
+            with _sink_lock:
+                try:
+                    with open(JSONL_PATH, "a", encoding="utf-8") as f:
+                        f.write(line)
+                except OSError:
+                    pass
+
+    def as_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_seconds": self.root.duration,
+            "attributes": self.root.attributes,
+            "spans": [
+                {
+                    "name": span.name,
+                    "span_id": span.span_id,
+                    "parent_id": span.parent_id,
+                    "offset_seconds": span.start - self.root.start,
+                    "duration_seconds": span.duration,
+                    "attributes": span.attributes,
+                }
+                for span in sorted(self.spans, key=lambda span: span.start)
+            ],
+        }
+
+
+def _is_control_flow(error):
+    # st.stop() / st.rerun() raise ScriptControlException subclasses; matched by name so
+    # this module does not import streamlit
+    return any(cls.__name__ == "ScriptControlException" for cls in type(error).__mro__)
+
+
+def start_span(name, **attributes):
+    """Open a span without making it current, e.g. for a generator that outlives the
+    caller's frame. End it with ``span.end()``."""
+    if not ENABLED:
+        return _NOOP_SPAN
+    parent = _current_span.get()
+    if parent is None:
+        trace = Trace(name)
+        new_span = Span(name, trace, None, attributes)
+        trace.root = new_span
+        return new_span
+    return Span(name, parent.trace, parent.span_id, attributes)
+
+
+@contextmanager
+def span(name, **attributes):
+    """Time a block as a span; nested spans (in this thread / context) become children."""
+    current = start_span(name, **attributes)
+    if current is _NOOP_SPAN:
+        yield current
+        return
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as error:
+        if not _is_control_flow(error):
+            current.set(error=type(error).__name__)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end()
+
+
+# --- Export ---
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.startswith("/metrics"):
+            body = METRICS.prometheus_text().encode("utf-8")
+            content_type = "text/plain; version=0.0.4"
+        elif self.path.startswith("/traces"):
+            body = json.dumps(list(RECENT_TRACES), default=str).encode("utf-8")
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(port=None, host="0.0.0.0"):
+    """Serve /metrics and /traces from a daemon thread, once per process.
+
+    ``port`` defaults to MI_METRICS_PORT; without either nothing is started.
+    """
+    global _metrics_server
+    port = port or int(os.environ.get("MI_METRICS_PORT", "0"))
+    if not port:
+        return None
+    with _metrics_server_lock:
+        if _metrics_server is None:
+            try:
+                _metrics_server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError:
+                return None  # port taken, e.g. by a second app process
+            _metrics_server.daemon_threads = True
+            threading.Thread(target=_metrics_server.serve_forever, name="metrics", daemon=True).start()
+    return _metrics_server
@@ -0,0 +1,125 @@
+import re
+
+import tracing
+
+# --- MITI-style turn coding ---
+# Codes every student turn with rule-based MI behaviour codes (no LLM tokens): open
+# and closed questions, reflections, affirmations, "I" statements and advice. The
+# codes are added to the feedback transcript ("STUDENT [reflection]: ...") together
+# with the counts and the two MITI summary scores they allow (feedback.py).
+
+LABELS = {
+    "open_question": "open question",
+    "closed_question": "closed question",
+    "reflection": "reflection",
+    "affirmation": "affirmation",
+    "i_statement": "I statement",
+    "advice": "giving advice",
+}
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+
+# The question word may follow a short lead-in, e.g. "On a scale from 1 to 10, how ...".
+# "Can/could you tell me ..." is left to closed questions, as both evaluator prompts ask.
+OPEN_QUESTION = re.compile(
+    r"(?:^|[,;:]\s+)(?:so,?\s+|and\s+|okay,?\s+)?"
+    r"(?:what|how|why|in what way|tell me|describe|walk me through|help me understand)\b",
+    re.IGNORECASE,
+)
+# Open prompts phrased as a request rather than a question, with or without a "?"
+OPEN_PROMPT = re.compile(
+    r"^(?:so,?\s+|and\s+|okay,?\s+)?(?:please\s+)?"
+    r"(?:tell me|describe|walk me through|help me understand|talk me through|share (?:with me|a bit|more))\b",
+    re.IGNORECASE,
+)
+# Only phrasings that restate the patient; a bare "you're ..." is as often an order
+REFLECTION = re.compile(
+    r"^(?:so,?\s+)?(?:it sounds like|sounds like|it seems|you seem|you feel|you're feeling|you are feeling|"
+    r"you're worried|you're concerned|you're not sure|you're unsure|you want|you'd like|you would like|"
+    r"you've been|you have been|you're saying|what i'm hearing|i hear|i'm hearing|on one hand|part of you)\b",
+    re.IGNORECASE,
+)
+# Advice phrased as a question ("Why don't you just floss?"), not an open question
+ADVICE_QUESTION = re.compile(
+    r"(?:^|[,;:]\s+)(?:so,?\s+|and\s+|okay,?\s+)?"
+    r"(?:why (?:don't|do not|won't|wouldn't|can't|haven't|didn't|aren't|not) you|how about (?:you|if you)|"
+    r"what about (?:you )?(?:just )?trying)\b",
+    re.IGNORECASE,
+)
+ADVICE = re.compile(
+    r"\byou(?: should| must| need to| have to| ought to|'ve got to|'re going to have to| are going to have to)\b|"
+    r"(?:^|[,;:]\s*)(?:stop|start|make sure|don't|do not|remember to|try to)\b",
+    re.IGNORECASE,
+)
+AFFIRMATION = re.compile(
+    r"\b(?:you've already|you have already|you've really|you clearly|it's clear (?:that )?you|"
+    r"that's (?:great|wonderful|impressive|a great)|great (?:job|idea|point|question)|good for you|well done|"
+    r"i appreciate|thank you for (?:sharing|being|telling)|you should be proud|that takes|that took)\b",
+    re.IGNORECASE,
+)
+# The provider's own view or advice ("I think you should ..."), not "I hear that ..."
+I_STATEMENT = re.compile(
+    r"^i(?:'d|'m| think| believe| recommend| would| want| feel)?\b(?! hear)(?!'m hearing)", re.IGNORECASE
+)
+
+
+def classify_turn(text):
+    """MI behaviour codes found in one student turn, in ``LABELS`` order."""
+    found = set()
+    for sentence in SENTENCE_SPLIT.split(text.strip()):
+        sentence = sentence.strip().strip("\"'“”")
+        if not sentence:
+            continue
+        if AFFIRMATION.search(sentence):
+            found.add("affirmation")
+        if OPEN_PROMPT.match(sentence):
+            found.add("open_question")
+        elif sentence.endswith("?"):
+            if ADVICE_QUESTION.search(sentence):
+                found.add("advice")
+            elif OPEN_QUESTION.search(sentence):
+                found.add("open_question")
+            elif REFLECTION.match(sentence) and not re.match(r"^(?:are|do|did|is)\b", sentence, re.IGNORECASE):
+                found.add("reflection")  # a reflection said with rising intonation
+            else:
+                found.add("closed_question")
+        elif REFLECTION.match(sentence):
+            found.add("reflection")
+        else:
+            # Anything else stays unlabelled unless it is advice or the provider's own view
+            if ADVICE.search(sentence):
+                found.add("advice")
+            if I_STATEMENT.match(sentence):
+                found.add("i_statement")
+    return [label for label in LABELS if label in found]
+
+
+def annotate(chat_history, cached=None):
+    """``{chat_history index: {"labels": [...]}}`` for every student turn.
+
+    Turns with an entry in ``cached`` (coded as they were sent) are not coded again.
+    """
+    cached = cached or {}
+    with tracing.span("annotate.transcript") as annotate_span:
+        annotations = {
+            index: {"labels": cached[index]["labels"] if index in cached else classify_turn(message["content"])}
+            for index, message in enumerate(chat_history)
+            if message["role"] == "user"
+        }
+        annotate_span.set(turns=len(annotations), cached=sum(index in cached for index in annotations))
+    return annotations
+
+
+def summarize(annotations):
+    """Code counts plus the two MITI summary scores they allow."""
+    counts = {label: 0 for label in LABELS}
+    for annotation in annotations.values():
+        for label in annotation["labels"]:
+            counts[label] += 1
+    questions = counts["open_question"] + counts["closed_question"]
+    return {
+        "turns": len(annotations),
+        "counts": counts,
+        "percent_open_questions": round(100 * counts["open_question"] / questions) if questions else None,
+        "reflection_to_question_ratio": round(counts["reflection"] / questions, 2) if questions else None,
+    }
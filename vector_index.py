@@ -0,0 +1,196 @@
+import argparse
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, replace
+
+import faiss
+import numpy as np
+
+# --- Vector index modes for rubric retrieval ---
+#   flat_l2   exact L2 over raw embeddings (the original IndexFlatL2)
+#   flat_ip   exact inner product over L2-normalised embeddings, i.e. cosine (default)
+#   hnsw      approximate graph search (IndexHNSWFlat), tuned with ef_search
+#   ivfpq     inverted lists + product quantisation with trained centroids, tuned with nprobe
+# Every index is wrapped in an IndexIDMap so vector ids stay the engine's chunk ids.
+#
+#   python vector_index.py report ohi_rubrics hpv_rubrics
+# compares every mode against the exact baseline (recall@k and query latency).
+
+INDEX_TYPES = ("flat_l2", "flat_ip", "hnsw", "ivfpq")
+
+
+@dataclass(frozen=True)
+class IndexConfig:
+    kind: str = os.environ.get("MI_RAG_INDEX", "flat_ip")
+    hnsw_m: int = 32
+    ef_construction: int = 80
+    ef_search: int = int(os.environ.get("MI_RAG_EF_SEARCH", "64"))
+    nlist: int = 64  # IVF cells, reduced automatically for small corpora
+    pq_m: int = 16  # sub-quantizers; must divide the embedding dimension
+    pq_bits: int = 8
+    nprobe: int = int(os.environ.get("MI_RAG_NPROBE", "8"))
+
+    @property
+    def normalized(self):
+        return self.kind != "flat_l2"
+
+    def as_dict(self):
+        return asdict(self)
+
+    def cache_tag(self):
+        # Search-time knobs (ef_search, nprobe) do not change the stored index
+        build = {key: value for key, value in self.as_dict().items() if key not in ("ef_search", "nprobe")}
+        return "index:" + json.dumps(build, sort_keys=True)
+
+
+DEFAULT_INDEX = IndexConfig()
+
+
+def normalize(vectors):
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def effective_config(config, count):
+    """IVF-PQ needs enough vectors to train; smaller corpora fall back to exact search."""
+    if config.kind != "ivfpq":
+        return config
+    # faiss wants ~39 training points per centroid, and each PQ codebook has 2**pq_bits
+    if count < 39 * 2 ** config.pq_bits:
+        return replace(config, kind="flat_ip")
+    return replace(config, nlist=max(1, min(config.nlist, count // 39)))
+
+
+def build_index(config, dimension, vectors, ids):
+    """Build an IndexIDMap-wrapped index of ``config.kind`` over ``vectors`` (already
+    normalised by the caller when ``config.normalized``)."""
+    vectors = np.ascontiguousarray(vectors, dtype="float32").reshape(-1, dimension)
+    config = effective_config(config, len(vectors))
+    if config.kind == "flat_l2":
+        base = faiss.IndexFlatL2(dimension)
+    elif config.kind == "flat_ip":
+        base = faiss.IndexFlatIP(dimension)
+    elif config.kind == "hnsw":
+        base = faiss.IndexHNSWFlat(dimension, config.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        base.hnsw.efConstruction = config.ef_construction
+    elif config.kind == "ivfpq":
+        quantizer = faiss.IndexFlatIP(dimension)
+        base = faiss.IndexIVFPQ(quantizer, dimension, config.nlist, config.pq_m, config.pq_bits,
+                                faiss.METRIC_INNER_PRODUCT)
+        base.train(vectors)
+    else:
+        raise ValueError(f"unknown index type {config.kind!r}, expected one of {INDEX_TYPES}")
+
+    index = faiss.IndexIDMap(base)
+    if len(vectors):
+        index.add_with_ids(vectors, np.asarray(ids, dtype="int64"))
+    apply_search_params(index, config)
+    return index
+
+
+def apply_search_params(index, config):
+    params = faiss.ParameterSpace()
+    if config.kind == "hnsw":
+        params.set_index_parameter(index, "efSearch", config.ef_search)
+    elif config.kind == "ivfpq" and isinstance(faiss.downcast_index(index.index), faiss.IndexIVF):
+        params.set_index_parameter(index, "nprobe", config.nprobe)
+
+
+def supports_remove(index):
+    # HNSW graphs cannot drop vectors; the engine rebuilds those instead
+    return not isinstance(faiss.downcast_index(index.index), faiss.IndexHNSW)
+
+
+# --- Recall vs latency report ---
+
+def _search_timed(index, queries, k):
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        latencies.append(time.perf_counter() - start)
+        results.append(ids[0])
+    return np.array(results), np.array(latencies)
+
+
+def evaluate(vectors, configs, k=5, num_queries=200, seed=0):
+    """Recall@k and per-query latency of each config against exact cosine search."""
+    vectors = normalize(vectors)
+    ids = np.arange(len(vectors), dtype="int64")
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(len(vectors), size=min(num_queries, len(vectors)), replace=False)
+    # Chunk vectors plus a little noise stand in for real queries about the rubric
+    queries = normalize(vectors[sample] + rng.normal(scale=0.05, size=vectors[sample].shape).astype("float32"))
+
+    exact = build_index(IndexConfig(kind="flat_ip"), vectors.shape[1], vectors, ids)
+    truth, _ = _search_timed(exact, queries, k)
+
+    rows = []
+    for config in configs:
+        start = time.perf_counter()
+        index = build_index(config, vectors.shape[1], vectors, ids)
+        build_seconds = time.perf_counter() - start
+        found, latencies = _search_timed(index, queries, k)
+        recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(found, truth)])
+        used = effective_config(config, len(vectors))
+        rows.append({
+            "kind": config.kind,
+            "effective_kind": used.kind,
+            "ef_search": config.ef_search if used.kind == "hnsw" else None,
+            "nprobe": config.nprobe if used.kind == "ivfpq" else None,
+            "recall_at_k": round(float(recall), 4),
+            "latency_ms_p50": round(float(np.percentile(latencies, 50)) * 1000, 4),
+            "latency_ms_p95": round(float(np.percentile(latencies, 95)) * 1000, 4),
+            "build_seconds": round(build_seconds, 4),
+            "index_bytes": int(faiss.serialize_index(index).size),
+        })
+    return rows
+
+
+def default_sweep():
+    configs = [IndexConfig(kind="flat_l2"), IndexConfig(kind="flat_ip")]
+    configs += [IndexConfig(kind="hnsw", ef_search=ef) for ef in (16, 32, 64, 128)]
+    configs += [IndexConfig(kind="ivfpq", nprobe=nprobe) for nprobe in (1, 4, 8, 16)]
+    return configs
+
+
+def main():
+    from rag_engine import RubricRAGEngine
+    from embedding_cache import DEFAULT_CACHE_DIR, EmbeddingCache
+
+    parser = argparse.ArgumentParser(description="Recall vs latency of each index mode on the rubric corpus.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    report = sub.add_parser("report")
+    report.add_argument("rubric_dirs", nargs="+")
+    report.add_argument("--k", type=int, default=5)
+    report.add_argument("--queries", type=int, default=200)
+    report.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    report.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    cache = EmbeddingCache(args.cache_dir)
+    vectors = np.concatenate([
+        RubricRAGEngine(rubrics_dir, cache=cache, index_config=IndexConfig(kind="flat_ip")).vectors()
+        for rubrics_dir in args.rubric_dirs
+    ])
+    rows = evaluate(vectors, default_sweep(), k=args.k, num_queries=args.queries)
+    if args.json:
+        print(json.dumps({"chunks": len(vectors), "k": args.k, "results": rows}, indent=2))
+        return
+
+    print(f"{len(vectors)} chunks, recall@{args.k} against exact cosine search")
+    print(f"{'mode':<18}{'recall':>8}{'p50 ms':>10}{'p95 ms':>10}{'build s':>10}{'bytes':>12}")
+    for row in rows:
+        label = row["kind"] if row["kind"] == row["effective_kind"] else f"{row['kind']}->{row['effective_kind']}"
+        if row["ef_search"]:
+            label += f" ef={row['ef_search']}"
+        if row["nprobe"]:
+            label += f" np={row['nprobe']}"
+        print(f"{label:<18}{row['recall_at_k']:>8.3f}{row['latency_ms_p50']:>10.3f}"
+              f"{row['latency_ms_p95']:>10.3f}{row['build_seconds']:>10.3f}{row['index_bytes']:>12}")
+
+
+if __name__ == "__main__":
+    main()